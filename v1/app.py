@@ -1,26 +1,78 @@
 import os
+import time
+import asyncio
 import logging
 import json
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 import httpx
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mcp_server.log'),
-        logging.StreamHandler()  # This will print to console
-    ]
-)
+# Load environment variables (before logging, which reads LOG_* settings)
+load_dotenv()
+
+from log_utils import Payload, sampled, setup_logging
+
+# Configure logging: records are queued and written by a background thread
+# (flushed at exit); payloads are only serialized at DEBUG - see log_utils.py
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-app = FastAPI()
+# Overridable so benchmarks can point at a local stand-in server
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5").rstrip("/")
+
+# Shared OpenWeather client (created in lifespan, reused across requests)
+http_client: httpx.AsyncClient | None = None
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build the pooled client from HTTP_* environment settings"""
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+    http2 = os.getenv("HTTP2", "false").lower() in ("1", "true", "yes", "on")
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2 requested but 'h2' is not installed - using HTTP/1.1")
+            http2 = False
+    logger.info(f"HTTP client limits: {limits}, http2: {http2}")
+    return httpx.AsyncClient(limits=limits, timeout=float(os.getenv("HTTP_TIMEOUT", "10")), http2=http2)
+
+def http_pool_stats() -> dict:
+    """Best-effort connection pool snapshot for health checks"""
+    if http_client is None or http_client.is_closed:
+        return {"open": False}
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {
+        "open": True,
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "pending_requests": len(getattr(pool, "_requests", [])),
+    }
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    logger.info("=== MCP Weather Server Starting ===")
+    logger.info(f"Server started at {datetime.now().isoformat()}")
+    logger.info(f"Manifest loaded: {bool(manifest)}")
+    logger.info(f"OpenWeather API Key configured: {bool(os.getenv('OPENWEATHER_API_KEY'))}")
+    http_client = create_http_client()
+    logger.info("=== Server Ready ===")
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+        logger.info("=== MCP Weather Server Shutting Down ===")
+        logger.info(f"Server stopped at {datetime.now().isoformat()}")
+        logger.info("=== Server Stopped ===")
+
+app = FastAPI(lifespan=lifespan)
 
 # Load tool manifest
 try:
@@ -31,22 +83,31 @@ except Exception as e:
     logger.error(f"Failed to load manifest: {e}")
     manifest = {}
 
-# MCP-specific models (not standard JSON-RPC)
-class MCPRequest(BaseModel):
-    jsonrpc: str = "2.0"
-    id: int | str
-    method: str
-    params: dict | None = None
+# JSON-RPC encoding: orjson when available, compact stdlib json otherwise
+try:
+    import orjson
+
+    def encode(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def encode(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+class RPCError(Exception):
+    """JSON-RPC error raised by a method handler"""
 
-class MCPResponse(BaseModel):
-    jsonrpc: str = "2.0"
-    id: int | str
-    result: dict | None = None
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
 
-class MCPErrorResponse(BaseModel):
-    jsonrpc: str = "2.0"
-    id: int | str
-    error: dict
+def result_message(msg_id, result) -> bytes:
+    """Response envelope; `result` may already be serialized (static responses)"""
+    body = result if isinstance(result, bytes) else encode(result)
+    return b'{"jsonrpc":"2.0","id":' + encode(msg_id) + b',"result":' + body + b'}'
+
+def error_message(msg_id, code: int, message: str) -> bytes:
+    return encode({"jsonrpc": "2.0", "id": msg_id, "error": {"code": code, "message": message}})
 
 # Helper: get OpenWeather API key
 def get_api_key() -> str:
@@ -54,193 +115,177 @@ def get_api_key() -> str:
     if not key:
         logger.error("OPENWEATHER_API_KEY environment variable not set")
         raise HTTPException(status_code=500, detail="OPENWEATHER_API_KEY not set")
-    logger.info("OpenWeather API key loaded successfully")
+    logger.debug("OpenWeather API key loaded successfully")
     return key
 
 # Helper: fetch raw weather data
 async def fetch_current_weather(location: str, units: str = "metric") -> dict:
     params = {"q": location, "units": units, "appid": get_api_key()}
-    logger.info(f"Fetching weather data for location: {location}, units: {units}")
+    logger.debug("Fetching weather data for location: %s, units: %s", location, units)
     
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                "https://api.openweathermap.org/data/2.5/weather", params=params
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            logger.info(f"Weather API response: {json.dumps(data, indent=2)}")
-            return data
+        resp = await http_client.get(
+            f"{OPENWEATHER_BASE_URL}/weather", params=params
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        logger.debug("Weather API response: %s", Payload(data))
+        return data
     except Exception as e:
-        logger.error(f"Weather API request failed: {str(e)}")
+        logger.error("Weather API request failed: %s", e)
         raise
 
-# MCP endpoint
+# MCP method handlers: name -> async handler(params) returning a result dict or pre-serialized bytes
+METHOD_HANDLERS = {}
+
+def rpc_method(name: str):
+    def register(handler):
+        METHOD_HANDLERS[name] = handler
+        return handler
+    return register
+
+TOOL_NAME = manifest.get("name", "get_current_weather")
+
+# Static results are serialized once at import and spliced into each response
+INITIALIZE_RESULT = encode({
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "tools": {}
+    },
+    "serverInfo": {
+        "name": "weather-server",
+        "version": "1.0.0"
+    }
+})
+
+TOOLS_LIST_RESULT = encode({"tools": [{
+    "name": TOOL_NAME,
+    "description": manifest.get("description", "Get current weather for a location"),
+    "inputSchema": manifest.get("parameters", {
+        "type": "object",
+        "properties": {
+            "location": {"type": "string", "description": "City name"},
+            "units": {"type": "string", "enum": ["metric", "imperial"], "default": "metric"}
+        },
+        "required": ["location"]
+    })
+}]})
+
+@rpc_method("initialize")
+async def handle_initialize(params: dict) -> bytes:
+    return INITIALIZE_RESULT
+
+@rpc_method("tools/list")
+async def handle_tools_list(params: dict) -> bytes:
+    return TOOLS_LIST_RESULT
+
+@rpc_method("tools/call")
+async def handle_tools_call(params: dict) -> dict:
+    if not params:
+        logger.error("Missing parameters in tools/call request")
+        raise RPCError(-32602, "Missing parameters")
+
+    tool_name = params.get("name")
+    arguments = params.get("arguments") or {}
+    logger.debug("Tool call - Name: %s, Arguments: %s", tool_name, Payload(arguments))
+    if tool_name != TOOL_NAME:
+        logger.error("Unknown tool requested: %s", tool_name)
+        raise RPCError(-32601, f"Tool '{tool_name}' not found")
+
+    location = arguments.get("location")
+    units = arguments.get("units", "metric")
+    if not location:
+        logger.error("Missing required parameter: location")
+        raise RPCError(-32602, "Missing required parameter: location")
+
+    try:
+        data = await fetch_current_weather(location, units)
+        text = f"Current weather in {location}: Temperature: {data['main']['temp']}°, Conditions: {data['weather'][0]['description']}"
+    except Exception as e:
+        logger.error("Weather API call failed: %s", e)
+        raise RPCError(-32603, f"Weather API error: {str(e)}")
+    logger.debug("Generated weather response: %s", text)
+    return {"content": [{"type": "text", "text": text}], "isError": False}
+
+async def handle_message(msg, log_info: bool) -> bytes | None:
+    """Dispatch one JSON-RPC message; notifications (no id) produce no response"""
+    if not isinstance(msg, dict):
+        return error_message(None, -32600, "Invalid Request")
+    msg_id = msg.get("id")
+    method = msg.get("method")
+    ctx = {"method": method, "id": msg_id}  # JSON log fields
+    if msg.get("jsonrpc") != "2.0":
+        logger.warning("Invalid JSON-RPC version: %s", msg.get("jsonrpc"), extra={"ctx": ctx})
+        return error_message(msg_id, -32600, "Invalid Request - only JSON-RPC 2.0 supported")
+    if not isinstance(method, str):
+        return error_message(msg_id, -32600, "Invalid Request - missing method")
+
+    handler = METHOD_HANDLERS.get(method)
+    if handler is None:
+        if "id" not in msg:
+            return None
+        logger.warning("Unknown method requested: %s", method, extra={"ctx": ctx})
+        return error_message(msg_id, -32601, f"Method '{method}' not found")
+
+    if log_info:
+        logger.info("MCP request - Method: %s, ID: %s", method, msg_id, extra={"ctx": ctx})
+    try:
+        result = await handler(msg.get("params") or {})
+    except RPCError as e:
+        response = error_message(msg_id, e.code, e.message)
+    except Exception as e:
+        logger.error("Unexpected error in %s: %s", method, e, exc_info=True, extra={"ctx": ctx})
+        response = error_message(msg_id, -32603, f"Internal error: {str(e)}")
+    else:
+        response = result_message(msg_id, result)
+    return response if "id" in msg else None
+
+# MCP endpoint (single messages and JSON-RPC batch arrays)
 @app.post("/mcp")
 async def mcp_endpoint(request: Request):
-    timestamp = datetime.now().isoformat()
-    logger.info(f"=== MCP REQUEST START [{timestamp}] ===")
-    
+    started = time.perf_counter()
+    # Sampled-out requests skip INFO request logs; warnings/errors are always written
+    log_info = sampled() and logger.isEnabledFor(logging.INFO)
+
+    raw = await request.body()
     try:
-        # Log raw request
-        body = await request.json()
-        logger.info(f"Raw request body: {json.dumps(body, indent=2)}")
-        
-        # Log request headers
-        headers = dict(request.headers)
-        logger.info(f"Request headers: {json.dumps(headers, indent=2)}")
-        
-        req = MCPRequest(**body)
-        logger.info(f"Parsed MCP request - Method: {req.method}, ID: {req.id}, Params: {req.params}")
-        
-        response_data = None
-        
-        # Only JSON-RPC 2.0
-        if req.jsonrpc != "2.0":
-            logger.warning(f"Invalid JSON-RPC version: {req.jsonrpc}")
-            response_data = MCPErrorResponse(
-                id=req.id,
-                error={"code": -32600, "message": "Invalid Request - only JSON-RPC 2.0 supported"}
-            ).dict()
-
-        # Handle initialize method
-        elif req.method == "initialize":
-            logger.info("Processing initialize request")
-            response_data = MCPResponse(
-                id=req.id,
-                result={
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {
-                        "tools": {}
-                    },
-                    "serverInfo": {
-                        "name": "weather-server",
-                        "version": "1.0.0"
-                    }
-                }
-            ).dict()
-
-        # Handle tools/list method
-        elif req.method == "tools/list":
-            logger.info("Processing tools/list request")
-            tool_def = {
-                "name": manifest.get("name", "get_current_weather"),
-                "description": manifest.get("description", "Get current weather for a location"),
-                "inputSchema": manifest.get("parameters", {
-                    "type": "object",
-                    "properties": {
-                        "location": {"type": "string", "description": "City name"},
-                        "units": {"type": "string", "enum": ["metric", "imperial"], "default": "metric"}
-                    },
-                    "required": ["location"]
-                })
-            }
-            logger.info(f"Returning tool definition: {json.dumps(tool_def, indent=2)}")
-            response_data = MCPResponse(
-                id=req.id,
-                result={"tools": [tool_def]}
-            ).dict()
-
-        # Handle tools/call method
-        elif req.method == "tools/call":
-            logger.info("Processing tools/call request")
-            
-            if not req.params:
-                logger.error("Missing parameters in tools/call request")
-                response_data = MCPErrorResponse(
-                    id=req.id,
-                    error={"code": -32602, "message": "Missing parameters"}
-                ).dict()
-            else:
-                tool_name = req.params.get("name")
-                arguments = req.params.get("arguments", {})
-                logger.info(f"Tool call - Name: {tool_name}, Arguments: {arguments}")
-                
-                if tool_name != manifest.get("name", "get_current_weather"):
-                    logger.error(f"Unknown tool requested: {tool_name}")
-                    response_data = MCPErrorResponse(
-                        id=req.id,
-                        error={"code": -32601, "message": f"Tool '{tool_name}' not found"}
-                    ).dict()
-                else:
-                    location = arguments.get("location")
-                    units = arguments.get("units", "metric")
-                    
-                    if not location:
-                        logger.error("Missing required parameter: location")
-                        response_data = MCPErrorResponse(
-                            id=req.id,
-                            error={"code": -32602, "message": "Missing required parameter: location"}
-                        ).dict()
-                    else:
-                        try:
-                            logger.info(f"Calling weather API for location: {location}")
-                            data = await fetch_current_weather(location, units)
-                            text = f"Current weather in {location}: Temperature: {data['main']['temp']}°, Conditions: {data['weather'][0]['description']}"
-                            logger.info(f"Generated weather response: {text}")
-                            
-                            response_data = MCPResponse(
-                                id=req.id,
-                                result={
-                                    "content": [{"type": "text", "text": text}],
-                                    "isError": False
-                                }
-                            ).dict()
-                        except Exception as e:
-                            logger.error(f"Weather API call failed: {str(e)}")
-                            response_data = MCPErrorResponse(
-                                id=req.id,
-                                error={"code": -32603, "message": f"Weather API error: {str(e)}"}
-                            ).dict()
-
-        # Method not found
+        body = json.loads(raw)
+    except ValueError as e:
+        logger.warning("Unparseable MCP request: %s", e)
+        return Response(error_message(None, -32700, f"Parse error: {str(e)}"), media_type="application/json")
+    # Log raw request (Payload defers serialization to the writer thread)
+    logger.debug("Raw request body: %s", Payload(body))
+    logger.debug("Request headers: %s", Payload(request.headers))
+
+    if isinstance(body, list):
+        if not body:
+            content = error_message(None, -32600, "Invalid Request - empty batch")
         else:
-            logger.warning(f"Unknown method requested: {req.method}")
-            response_data = MCPErrorResponse(
-                id=req.id,
-                error={"code": -32601, "message": f"Method '{req.method}' not found"}
-            ).dict()
-
-        # Log the response
-        logger.info(f"MCP Response: {json.dumps(response_data, indent=2)}")
-        logger.info(f"=== MCP REQUEST END [{timestamp}] ===")
-        
-        return response_data
+            # Batch items run concurrently; responses keep request order, notifications are omitted
+            responses = [r for r in await asyncio.gather(*(handle_message(m, log_info) for m in body)) if r is not None]
+            content = b"[" + b",".join(responses) + b"]" if responses else None
+    else:
+        content = await handle_message(body, log_info)
 
-    except Exception as e:
-        logger.error(f"Unexpected error processing MCP request: {str(e)}", exc_info=True)
-        error_response = MCPErrorResponse(
-            id=getattr(req, 'id', 0) if 'req' in locals() else 0,
-            error={"code": -32700, "message": f"Parse error: {str(e)}"}
-        ).dict()
-        logger.info(f"Error response: {json.dumps(error_response, indent=2)}")
-        logger.info(f"=== MCP REQUEST END (ERROR) [{timestamp}] ===")
-        return error_response
+    if log_info:
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        batch = len(body) if isinstance(body, list) else 1
+        ctx = {"messages": batch, "duration_ms": duration_ms}
+        if isinstance(body, dict):
+            ctx.update(method=body.get("method"), id=body.get("id"))
+        logger.info("MCP request done - %d message(s), %.3f ms", batch, duration_ms, extra={"ctx": ctx})
+    if content is None:
+        return Response(status_code=202)  # notifications only
+    logger.debug("MCP Response: %s", Payload(content.decode()))
+    return Response(content, media_type="application/json")
 
 # Health check with logging
 @app.get("/ping")
 async def ping() -> dict:
-    logger.info("Health check ping received")
-    response = {"pong": True, "timestamp": datetime.now().isoformat()}
-    logger.info(f"Health check response: {response}")
+    response = {"pong": True, "timestamp": datetime.now().isoformat(), "http_pool": http_pool_stats()}
+    logger.debug("Health check response: %s", Payload(response))
     return response
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("=== MCP Weather Server Starting ===")
-    logger.info(f"Server started at {datetime.now().isoformat()}")
-    logger.info(f"Manifest loaded: {bool(manifest)}")
-    logger.info(f"OpenWeather API Key configured: {bool(os.getenv('OPENWEATHER_API_KEY'))}")
-    logger.info("=== Server Ready ===")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("=== MCP Weather Server Shutting Down ===")
-    logger.info(f"Server stopped at {datetime.now().isoformat()}")
-    logger.info("=== Server Stopped ===")
-
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting server with uvicorn")
@@ -1,7 +1,8 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-# 1) Stop & remove compose-managed containers, local images, and volumes
+# 1) Stop & remove compose-managed containers, local images, and this project's volumes
+#    (no host-wide volume prune: other stacks' volumes, e.g. the weather cache, must survive)
 docker-compose down --rmi local -v
 
 # 2) Remove any stray containers based on demomcp:latest
@@ -11,13 +12,10 @@ docker ps -a --filter ancestor=demomcp:latest -q \
 # 3) Force-remove the demomcp:latest image
 docker rmi -f demomcp:latest || true
 
-# 4) Prune dangling volumes
-docker volume prune -f
-
-# 5) Rebuild the image
+# 4) Rebuild the image
 docker build -t demomcp:latest .
 
-# 6) Bring the stack back up
+# 5) Bring the stack back up
 docker-compose up -d
 
 echo "✅ Cleanup, build and run complete."
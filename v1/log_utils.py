@@ -0,0 +1,78 @@
+# log_utils.py - Low-overhead logging for the MCP server hot path
+import os
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_FILE = os.getenv("LOG_FILE", "mcp_server.log")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))  # share of requests with INFO request logs
+LOG_PAYLOAD_MAX_BYTES = int(os.getenv("LOG_PAYLOAD_MAX_BYTES", "2048"))
+
+class Payload:
+    """Defers JSON serialization (and truncation) until a handler actually formats the record"""
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        obj = self.obj
+        if not isinstance(obj, (dict, list, str, int, float, bool, type(None))) and hasattr(obj, "items"):
+            obj = dict(obj.items())
+        text = json.dumps(obj, default=str, ensure_ascii=False)
+        data = text.encode()
+        if len(data) > LOG_PAYLOAD_MAX_BYTES:
+            # Cut on the UTF-8 bytes; a multi-byte character split at the limit is dropped
+            text = f"{data[:LOG_PAYLOAD_MAX_BYTES].decode(errors='ignore')}... [truncated, {len(data)} bytes]"
+        return text
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={"ctx": {...}}` fields are merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        ctx = getattr(record, "ctx", None)
+        if ctx:
+            entry.update(ctx)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record untouched; formatting (and Payload serialization) happens on the writer thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def sampled() -> bool:
+    """Per-request decision for INFO-level request logs (warnings and errors are always logged)"""
+    return LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background writer thread"""
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else \
+        logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [logging.FileHandler(LOG_FILE), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
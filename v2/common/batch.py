@@ -0,0 +1,38 @@
+# common/batch.py - Tool request model and the /v1/batch endpoint shared by the tool services
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Union
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+# Batch items handled at once per /v1/batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+class ToolRequest(BaseModel):
+    tool_name: str
+    arguments: Dict[str, Any]
+    request_id: Union[int, str]
+
+ToolHandler = Callable[[ToolRequest], Awaitable[Dict[str, Any]]]
+
+def make_batch_route(app: FastAPI, handlers: Dict[str, ToolHandler], path: str = "/v1/batch",
+                     concurrency: int = BATCH_CONCURRENCY):
+    """Add POST `path`: a list of tool requests in, one result per request out (same order).
+
+    Each item runs its own handler under its own request_id, so traces and per-tool metrics stay per call;
+    identical items share work through the services' single-flight caches rather than being merged here.
+    """
+    @app.post(path)
+    async def batch(requests: List[ToolRequest]):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(request: ToolRequest):
+            handler = handlers.get(request.tool_name)
+            if handler is None:
+                return {"content": [{"type": "text", "text": f"Unknown tool: {request.tool_name}"}], "isError": True}
+            async with semaphore:
+                return await handler(request)
+
+        return list(await asyncio.gather(*(run(request) for request in requests)))
+
+    return batch
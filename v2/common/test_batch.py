@@ -0,0 +1,21 @@
+# test_batch.py - The shared /v1/batch endpoint
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from batch import make_batch_route
+
+def test_each_item_runs_under_its_own_request_id():
+    seen = []
+
+    async def echo(request):
+        seen.append(request.request_id)
+        return {"content": [{"type": "text", "text": f"{request.arguments['q']}:{request.request_id}"}], "isError": False}
+
+    app = FastAPI()
+    make_batch_route(app, {"echo": echo})
+    items = [{"tool_name": "echo", "arguments": {"q": "same"}, "request_id": rid} for rid in ("a", "b")]
+    items.append({"tool_name": "nope", "arguments": {}, "request_id": 3})
+    results = TestClient(app).post("/v1/batch", json=items).json()
+
+    assert [r["content"][0]["text"] for r in results] == ["same:a", "same:b", "Unknown tool: nope"]
+    assert [r["isError"] for r in results] == [False, False, True]
+    assert sorted(seen) == ["a", "b"]  # identical items are not merged into the first one's trace
@@ -0,0 +1,46 @@
+# common/tool_metrics.py - Per-tool request instrumentation for the tool services
+import os
+import time
+import logging
+import functools
+from contextvars import ContextVar
+from common.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with their request_id (the gateway's trace id)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+_requests = REGISTRY.counter("mcptool_requests_total", "Tool requests received", ("tool",))
+_errors = REGISTRY.counter("mcptool_errors_total", "Tool requests that returned isError or raised", ("tool",))
+_inflight = REGISTRY.gauge("mcptool_inflight", "Tool requests in progress", ("tool",))
+_duration = REGISTRY.histogram("mcptool_request_duration_seconds", "Tool handler time", ("tool",))
+
+# request_id of the tool request being served, for attributing upstream calls
+current_request_id: ContextVar = ContextVar("request_id", default=None)
+
+def instrument(tool_name: str):
+    """Count, time and trace a tool handler taking one ToolRequest (direct and /v1/batch calls alike)"""
+    def decorate(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            token = current_request_id.set(request.request_id)
+            _requests.inc(tool_name)
+            _inflight.inc(tool_name)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await handler(request)
+                failed = isinstance(result, dict) and bool(result.get("isError"))
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                _inflight.dec(tool_name)
+                _duration.observe(elapsed, tool_name)
+                if failed:
+                    _errors.inc(tool_name)
+                if elapsed * 1000 >= SLOW_REQUEST_MS:
+                    logger.warning(f"Slow {tool_name} request_id={request.request_id}: {elapsed * 1000:.1f}ms")
+                current_request_id.reset(token)
+        return wrapper
+    return decorate
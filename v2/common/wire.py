@@ -0,0 +1,119 @@
+# common/wire.py - Tool response negotiation, both sides: tool services encode MessagePack or JSON (zstd/gzip above
+# a size threshold) as the caller asks; the gateway asks for MessagePack when it can decode it
+import os
+import gzip
+import json
+from contextvars import ContextVar
+from typing import Any, Tuple
+from starlette.responses import Response
+
+try:  # optional: compact binary encoding
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:  # optional: faster, smaller compression than gzip
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+# Responses smaller than this are sent uncompressed (not worth the CPU)
+COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "4096"))
+GZIP_LEVEL = int(os.getenv("WIRE_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("WIRE_ZSTD_LEVEL", "3"))
+
+# (Accept, Accept-Encoding) of the request being handled, set by WireMiddleware
+_negotiation: ContextVar[Tuple[str, str]] = ContextVar("wire_negotiation", default=("", ""))
+
+def _tokens(header: str) -> set:
+    """Media types / codings listed in a header, minus any refused with q=0"""
+    accepted = set()
+    for item in header.lower().split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    pass
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+def _coding(accept_encoding: str) -> str | None:
+    codings = _tokens(accept_encoding)
+    if zstandard is not None and "zstd" in codings:
+        return "zstd"
+    if "gzip" in codings:
+        return "gzip"
+    return None
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class WireResponse(Response):
+    """Default response class: encodes handler results as the client asked (JSON if it didn't)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        accept, accept_encoding = _negotiation.get()
+        if msgpack is not None and _tokens(accept) & set(MSGPACK_TYPES):
+            self.media_type = "application/msgpack"
+            body = msgpack.packb(content)
+        else:
+            body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+        self._content_encoding = None
+        coding = _coding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+        if coding is not None:
+            body = _compress(body, coding)
+            self._content_encoding = coding
+        return body
+
+    def init_headers(self, headers=None):
+        super().init_headers(headers)
+        self.headers["vary"] = "Accept, Accept-Encoding"
+        if self._content_encoding is not None:
+            self.headers["content-encoding"] = self._content_encoding
+
+class WireMiddleware:
+    """Makes the request's Accept headers visible to WireResponse (pure ASGI, so context vars propagate)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept":
+                accept = value.decode("latin-1")
+            elif name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        token = _negotiation.set((accept, accept_encoding))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _negotiation.reset(token)
+
+# Gateway side: what to ask tools for
+ACCEPT = "application/msgpack, application/json;q=0.9" if msgpack is not None else "application/json"
+# Remote tools: httpx advertises gzip (plus zstd/br when installed) and decompresses responses itself
+REMOTE_HEADERS = {"Accept": ACCEPT}
+# In-process tools: compressing a response that never leaves memory only costs CPU
+LOCAL_HEADERS = {"Accept": ACCEPT, "Accept-Encoding": "identity"}
+
+def media_type(response) -> str:
+    return response.headers.get("content-type", "").split(";")[0].strip().lower()
+
+def decode(response) -> Any:
+    """Parse an httpx tool response in whichever format the tool chose"""
+    if msgpack is not None and media_type(response) in MSGPACK_TYPES:
+        return msgpack.unpackb(response.content)
+    return response.json()
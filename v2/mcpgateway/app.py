@@ -1,8 +1,22 @@
 # app.py - MCP Gateway Only
+import os
+import sys
 import yaml
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
+from starlette.responses import Response
+
+# Shared v2 modules live in ../common in the source tree; the image copies them into /app/common
+_V2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.isdir(os.path.join(_V2_DIR, "common")) and _V2_DIR not in sys.path:
+    sys.path.append(_V2_DIR)
+
 from utils.logger import setup_logging
-from tool import register_all_tools
+from common.metrics import REGISTRY, CONTENT_TYPE
+from utils.reload import ConfigWatcher
+from utils.shared_state import connect_store_from_env
+from utils.workers import Supervisor, WORKER_PORT_ENV
+from tool import register_all_tools, reload_tools, attach_shared_store, on_startup, TOOL_CONFIG_PATH
 
 def load_gateway_config(path: str = "gateway.yml") -> dict:
     """Load gateway configuration"""
@@ -23,27 +37,70 @@ def load_gateway_config(path: str = "gateway.yml") -> dict:
             }
         }
 
+TRANSPORTS = ("sse", "streamable-http", "stdio")
+
+@asynccontextmanager
+async def lifespan(server):
+    # Runs on the server's event loop; may run once per session on older FastMCP, so on_startup is idempotent
+    on_startup()
+    yield {}
+
+def announce(message: str, transport: str):
+    # stdout is the protocol channel for stdio, so status lines go to stderr there
+    print(message, file=sys.stderr if transport == "stdio" else sys.stdout)
+
 def main():
     # Setup logging
     setup_logging()
     
     # Load gateway configuration
     config = load_gateway_config()
+    server_config = config["server"]
+    transport = server_config.get("transport", "sse")
+    if transport not in TRANSPORTS:
+        raise SystemExit(f"Unsupported transport '{transport}' (expected one of {', '.join(TRANSPORTS)})")
+    worker_port = os.getenv(WORKER_PORT_ENV)
+    
+    # Multi-process mode: this process only supervises workers and routes sessions to them
+    if int(server_config.get("workers", 1)) > 1 and worker_port is None and transport != "stdio":
+        announce(f"🚀 Starting {config['gateway']['name']} router on {server_config['host']}:{server_config['port']} "
+                 f"with {server_config['workers']} workers", transport)
+        Supervisor(config).run()
+        return
+    
+    if worker_port is not None:
+        server_config = {**server_config, "host": "127.0.0.1", "port": int(worker_port)}
+        attach_shared_store(connect_store_from_env(float((config.get("shared_state") or {}).get("timeout", 0.5))))
     
     # Create MCP server
     gateway_name = config["gateway"]["name"]
-    mcp = FastMCP(gateway_name)
+    mcp = FastMCP(gateway_name, lifespan=lifespan)
+    
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def metrics(request):
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
     
     # Register all tools from tool.py
     tool_count = register_all_tools(mcp)
-    print(f"✅ Registered {tool_count} tools")
+    announce(f"✅ Registered {tool_count} tools", transport)
+    
+    # Hot reload: SIGHUP always, file polling when reload.watch is set
+    reload_config = config.get("reload", {})
+    watcher = ConfigWatcher(TOOL_CONFIG_PATH, lambda: reload_tools(mcp),
+                            interval=reload_config.get("interval", 2.0),
+                            watch=reload_config.get("watch", False))
+    watcher.install_sighup()
+    watcher.start()
     
     # Start gateway
-    server_config = config["server"]
-    print(f"🚀 Starting {gateway_name} on {server_config['host']}:{server_config['port']}")
+    if transport == "stdio":
+        announce(f"🚀 Starting {gateway_name} on stdio", transport)
+        mcp.run(transport="stdio")
+        return
     
+    announce(f"🚀 Starting {gateway_name} on {server_config['host']}:{server_config['port']} ({transport})", transport)
     mcp.run(
-        transport=server_config["transport"],
+        transport=transport,
         host=server_config["host"], 
         port=server_config["port"]
     )
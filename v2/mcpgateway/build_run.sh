@@ -3,7 +3,8 @@ set -euo pipefail
 
 echo "🧹 Starting MCP Gateway cleanup and build..."
 
-# 1) Stop & remove compose-managed containers, local images, and volumes
+# 1) Stop & remove compose-managed containers, local images, and this project's volumes
+#    (no host-wide volume prune: other stacks' volumes, e.g. the weather cache, must survive)
 echo "📦 Stopping docker-compose services..."
 docker-compose down --rmi local -v
 
@@ -16,15 +17,11 @@ docker ps -a --filter ancestor=mcp-gateway-v2:latest -q \
 echo "🔥 Removing old image..."
 docker rmi -f mcp-gateway-v2:latest || true
 
-# 4) Prune dangling volumes
-echo "🧽 Pruning dangling volumes..."
-docker volume prune -f
-
-# 5) Rebuild the image
+# 4) Rebuild the image
 echo "🏗️  Building new image: mcp-gateway-v2:latest..."
-docker build -t mcp-gateway-v2:latest .
+docker build --build-context common=../common -t mcp-gateway-v2:latest .  # common/: modules shared by the v2 services
 
-# 6) Bring the stack back up
+# 5) Bring the stack back up
 echo "🚀 Starting services..."
 docker-compose up -d
 
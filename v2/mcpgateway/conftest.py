@@ -0,0 +1,7 @@
+# conftest.py - Puts the gateway root (and the shared v2 modules) on sys.path so tests import tool and utils.* as app.py does
+import os
+import sys
+
+_V2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _V2_DIR not in sys.path:
+    sys.path.append(_V2_DIR)
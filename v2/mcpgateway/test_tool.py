@@ -0,0 +1,80 @@
+# test_tool.py - Hot reload of tool.yml against a running server loop
+import asyncio
+import threading
+import pytest
+import tool
+from fastmcp import FastMCP
+
+TOOL_YML = """
+tools:
+  - name: {name}
+    description: test tool
+    endpoint: http://127.0.0.1:9/v1/{name}
+    input_schema:
+      type: object
+      properties:
+        q: {{type: string}}
+"""
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "tool.yml"
+    monkeypatch.setattr(tool, "TOOL_CONFIG_PATH", str(path))
+    monkeypatch.setattr(tool, "_tools", {})
+    monkeypatch.setattr(tool, "_loop", None)
+    return path
+
+def test_reload_from_watcher_thread_runs_on_server_loop(config_file, monkeypatch):
+    mcp = FastMCP("test")
+    config_file.write_text(TOOL_YML.format(name="first"))
+    tool.register_all_tools(mcp)
+
+    sync_threads = []
+    sync_tools = tool._sync_tools
+    monkeypatch.setattr(tool, "_sync_tools", lambda *a: sync_threads.append(threading.current_thread()) or sync_tools(*a))
+
+    async def server():
+        tool.on_startup()
+        config_file.write_text(TOOL_YML.format(name="second"))
+        watcher = threading.Thread(target=tool.reload_tools, args=(mcp,))
+        watcher.start()
+        while watcher.is_alive():  # the reload needs this loop to make progress
+            await asyncio.sleep(0.01)
+        return [t.name for t in await mcp.list_tools()]
+
+    assert asyncio.run(server()) == ["second"]
+    assert sync_threads == [threading.main_thread()]
+
+def test_unreadable_file_keeps_tools(config_file):
+    mcp = FastMCP("test")
+    config_file.write_text(TOOL_YML.format(name="first"))
+    tool.register_all_tools(mcp)
+    config_file.write_text("")
+    assert tool.reload_tools(mcp) is None
+    assert list(tool._tools) == ["first"]
+
+HEALTH_CHECKED = """
+load_balancing:
+  health_check: {{interval: 60}}
+""" + TOOL_YML
+
+def test_health_checks_start_at_startup_and_on_reload(config_file, monkeypatch):
+    monkeypatch.setattr(tool, "_health_tasks", {})
+    mcp = FastMCP("test")
+    config_file.write_text(HEALTH_CHECKED.format(name="first"))
+    tool.register_all_tools(mcp)
+    assert tool._health_tasks == {}  # no loop yet
+
+    async def server():
+        tool.on_startup()
+        first = tool._health_tasks["first"]
+        tool.on_startup()  # idempotent
+        assert tool._health_tasks["first"] is first
+
+        config_file.write_text(HEALTH_CHECKED.format(name="second"))
+        await asyncio.to_thread(tool.reload_tools, mcp)
+        await asyncio.wait([first], timeout=1.0)  # cancellation unwinds the in-flight health probes
+        assert first.cancelled() and list(tool._health_tasks) == ["second"]
+        tool._stop_health_check("second")
+
+    asyncio.run(server())
@@ -1,103 +1,580 @@
 # tool.py - Simple Tool Management
+import os
+import json
+import time
+import uuid
 import yaml
 import httpx
+import asyncio
 import logging
+import threading
 from typing import Dict, Any
+from utils.cache import ResultCache
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryableError, RetryPolicy
+from utils.balancer import Balancer
+from utils.batcher import Batcher
+from utils.schema import ToolSchema
+from common.metrics import REGISTRY
+from utils.admission import Admission, OverloadedError
+from utils import inprocess
+from common import wire
+from urllib.parse import urlsplit
+from mcp import types as mcp_types
+
+try:  # identifies the calling MCP client for fair queuing
+    from fastmcp.server.dependencies import get_context
+except ImportError:
+    get_context = None
+
+try:  # structured passthrough results need fastmcp >= 2.10
+    from fastmcp.tools import ToolResult
+except ImportError:
+    try:
+        from fastmcp.tools.tool import ToolResult
+    except ImportError:
+        ToolResult = None
 
 logger = logging.getLogger(__name__)
 
-# Global config and client (initialized when config is loaded)
+TOOL_CONFIG_PATH = "tool.yml"
+
+# Global config and client (client is created on first load and kept across reloads)
 _config = None
 _client = None
+_reload_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None  # the server's event loop, set by on_startup()
+
+# Cross-worker store (multi-process mode with shared_state enabled), else None
+_shared = None
+_breaker_sync_task: asyncio.Task | None = None
+_publish_tasks: set = set()  # breaker trips being published; held so they aren't garbage-collected
+
+# Dispatch table: tool name -> compiled ToolSpec
+_tools: Dict[str, "ToolSpec"] = {}
+
+# Retry/hedging policy and per-endpoint (replica) circuit breakers
+_retry_policy = RetryPolicy()
+_hedge_config: Dict[str, Any] = {}
+_breaker_config: Dict[str, Any] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+# Replica balancing defaults and per-tool health-check tasks
+_lb_defaults: Dict[str, Any] = {}
+_limits_defaults: Dict[str, Any] = {}
+_health_tasks: Dict[str, asyncio.Task] = {}
+
+# Batched calls are coalesced into POST <backend>/v1/batch, one batcher per backend
+_batching_config: Dict[str, Any] = {}
+_batchers: Dict[str, Batcher] = {}
+
+# Per-tool metrics (served at /metrics); calls slower than _slow_call are logged with their trace id
+_requests = REGISTRY.counter("mcpgateway_tool_requests_total", "Tool calls received", ("tool",))
+_errors = REGISTRY.counter("mcpgateway_tool_errors_total", "Tool calls that failed", ("tool",))
+_inflight = REGISTRY.gauge("mcpgateway_tool_inflight", "Tool calls in progress", ("tool",))
+_duration = REGISTRY.histogram("mcpgateway_tool_duration_seconds", "End-to-end call_tool time", ("tool",))
+_backend_duration = REGISTRY.histogram("mcpgateway_backend_duration_seconds",
+                                       "Backend HTTP time per call, retries and hedges included", ("tool",))
+_overhead = REGISTRY.histogram("mcpgateway_overhead_seconds",
+                               "Gateway time per backend call outside the backend request", ("tool",))
+_rejected = REGISTRY.counter("mcpgateway_tool_rejected_total", "Tool calls rejected by admission control", ("tool",))
+_response_bytes = REGISTRY.counter("mcpgateway_backend_response_bytes_total",
+                                   "Backend response bytes as received (before decompression)", ("format", "encoding"))
+_slow_call = 1.0
+
+class CallTrace:
+    """One tool call: calling client, trace id sent as the backend request_id, and time spent on the backend"""
+    __slots__ = ("client", "trace_id", "backend")
+    
+    def __init__(self, client: str = "default"):
+        self.client = client
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.backend = 0.0
+
+class ToolSpec:
+    """One tool.yml entry compiled for dispatch: schema, replicas, cache and call options"""
+
+    def __init__(self, tool_config: Dict[str, Any]):
+        self.config = tool_config
+        self.lb_defaults = _lb_defaults
+        self.limits_defaults = _limits_defaults
+        self.name = tool_config["name"]
+        self.description = tool_config.get("description", "")
+        self.schema = ToolSchema(tool_config.get("input_schema", {}))
+        self.in_process = None
+        balancer_config = tool_config
+        if tool_config.get("in_process"):
+            # Co-located tool: a single in-memory replica; the endpoint only supplies the path
+            self.in_process = inprocess.load(tool_config["in_process"], os.path.dirname(os.path.abspath(TOOL_CONFIG_PATH)))
+            endpoint = (tool_config.get("endpoints") or [tool_config.get("endpoint") or f"/v1/{self.name}"])[0]
+            lb_config = {**(tool_config.get("load_balancing") or {}), "health_check": None}
+            balancer_config = {**tool_config, "endpoints": [self.in_process.url(urlsplit(endpoint).path)],
+                               "load_balancing": lb_config}
+        self.balancer = Balancer.from_tool_config(balancer_config, _lb_defaults)
+        self.idempotent = bool(tool_config.get("idempotent"))
+        self.batch = bool(tool_config.get("batch"))
+        self.passthrough = bool(tool_config.get("passthrough"))
+        self.admission = Admission.from_config({**_limits_defaults, **(tool_config.get("limits") or {})})
+        
+        cache_config = tool_config.get("cache")
+        self.cache = ResultCache.from_config(cache_config if isinstance(cache_config, dict) else {}) if cache_config else None
+        if self.cache is not None:
+            self.cache.shared = _shared
+            self.cache.namespace = f"cache:{self.name}:"
+    
+    def same_interface(self, other: "ToolSpec") -> bool:
+        """True if FastMCP's view (description, schema, result shape) is unchanged"""
+        return (self.description == other.description
+                and self.passthrough == other.passthrough
+                and self.config.get("input_schema") == other.config.get("input_schema"))
+
+def attach_shared_store(store):
+    """Share result caches and circuit-breaker trips with the other gateway workers"""
+    global _shared
+    _shared = store
+
+def _read_tool_config() -> Dict[str, Any]:
+    """Parse tool.yml; an empty or half-written file raises instead of reading as an empty tool list"""
+    with open(TOOL_CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f)
+    if not isinstance(config, dict) or not isinstance(config.get("tools"), list):
+        raise ValueError(f"{TOOL_CONFIG_PATH} must be a mapping with a 'tools' list")
+    return config
+
+def _apply_http_config(config: Dict[str, Any]):
+    """Apply the http/load_balancing sections; the pooled client is created once and kept"""
+    global _config, _client, _retry_policy, _hedge_config, _breaker_config, _lb_defaults, _batching_config, _slow_call
+    global _limits_defaults
+    _config = config
+    
+    http_config = config.get("http", {})
+    timeout = http_config.get("timeout", 30.0)
+    connect_timeout = http_config.get("connect_timeout", min(timeout, 5.0))
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=connect_timeout))
+    else:
+        _client.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+    
+    _retry_policy = RetryPolicy.from_config(http_config)
+    _hedge_config = http_config.get("hedge") or {}
+    _breaker_config = http_config.get("circuit_breaker") or {}
+    _lb_defaults = config.get("load_balancing") or {}
+    _limits_defaults = config.get("limits") or {}
+    _batching_config = http_config.get("batching") or {}
+    _batchers.clear()  # rebuilt lazily with the new window/size; in-flight batches keep theirs
+    _slow_call = float((config.get("metrics") or {}).get("slow_call_ms", 1000)) / 1000
+    
+    logger.info(f"Loaded {len(config.get('tools', []))} tools from {TOOL_CONFIG_PATH} (timeout: {timeout}s, "
+                f"retries: {_retry_policy.retries}, hedge: {bool(_hedge_config)})")
 
 def load_tool_config():
     """Load tool config from file"""
-    global _config, _client
-    
     try:
-        with open("tool.yml", 'r') as f:
-            _config = yaml.safe_load(f)
-            
-            # Initialize HTTP client with config
-            http_config = _config.get("http", {})
-            timeout = http_config.get("timeout", 30.0)
-            _client = httpx.AsyncClient(timeout=timeout)
-            
-            tools = _config.get("tools", [])
-            logger.info(f"Loaded {len(tools)} tools from tool.yml (timeout: {timeout}s)")
-            return tools
-            
+        config = _read_tool_config()
+        _apply_http_config(config)
+        return config.get("tools", [])
     except FileNotFoundError:
-        logger.error("tool.yml file not found")
+        logger.error(f"{TOOL_CONFIG_PATH} file not found")
         return []
     except Exception as e:
         logger.error(f"Failed to load tool config: {e}")
         return []
 
-async def call_tool(endpoint: str, name: str, args: Dict[str, Any]) -> str:
-    """Call remote tool"""
+async def call_tool(name: str, args: Dict[str, Any], client: str = "default") -> str:
+    """Validate arguments, then call the remote tool (served from its result cache when configured)"""
     if _client is None:
         raise Exception("HTTP client not initialized - load config first")
+    spec = _tools.get(name)
+    if spec is None:
+        raise Exception(f"Unknown tool: {name}")
+    
+    trace = CallTrace(client)
+    _requests.inc(name)
+    _inflight.inc(name)
+    start = time.perf_counter()
+    try:
+        # Bad arguments are rejected here, before any network hop
+        args = spec.schema.validate(args)
         
-    payload = {"tool_name": name, "arguments": args, "request_id": 1}
+        if spec.cache is not None:
+            return await spec.cache.get_or_call(args, lambda: _post_tool(spec, args, trace))
+        return await _post_tool(spec, args, trace)
+    except Exception:
+        _errors.inc(name)
+        raise
+    finally:
+        _inflight.dec(name)
+        _record_call(name, trace, time.perf_counter() - start)
+
+def _record_call(name: str, trace: CallTrace, total: float):
+    """Split a call into backend time and gateway overhead (cache hits have no backend time)"""
+    _duration.observe(total, name)
+    if trace.backend:
+        _backend_duration.observe(trace.backend, name)
+        _overhead.observe(max(0.0, total - trace.backend), name)
+    if total >= _slow_call:
+        logger.warning(f"Slow call {name} trace={trace.trace_id}: total {total * 1000:.1f}ms, "
+                       f"backend {trace.backend * 1000:.1f}ms, gateway {(total - trace.backend) * 1000:.1f}ms")
+
+def _start_health_check(spec: ToolSpec):
+    """Start a tool's replica health-check loop; needs the server loop, so tools loaded before it wait for on_startup"""
+    health_check = spec.balancer.health_check
+    if _loop is not None and health_check and health_check.get("enabled", True) and spec.name not in _health_tasks:
+        _health_tasks[spec.name] = _loop.create_task(spec.balancer.run_health_checks(_client))
+
+async def _sync_shared_breakers(interval: float = 1.0):
+    """Adopt breaker trips published by other workers"""
+    while True:
+        try:
+            opened = await _shared.items("breaker:")
+        except Exception as e:
+            logger.debug(f"Shared breaker sync failed: {e!r}")
+            opened = {}
+        now = time.time()
+        for key, (expires_at, _) in opened.items():
+            _breaker(key[len("breaker:"):]).adopt_open(expires_at - now)
+        await asyncio.sleep(interval)
+
+async def _post_tool(spec: ToolSpec, args: Dict[str, Any], trace: CallTrace) -> str:
+    """POST one invocation to one of the tool's backend replicas"""
+    payload = {"tool_name": spec.name, "arguments": args, "request_id": trace.trace_id}
     
     try:
-        response = await _client.post(endpoint, json=payload)
-        result = response.json()
+        # Cache hits never get here, so limits only apply to calls that reach the backend
+        if spec.admission is not None:
+            try:
+                await spec.admission.acquire(trace.client)
+            except OverloadedError as e:
+                _rejected.inc(spec.name)
+                raise Exception(f"{spec.name} overloaded: {e}")
+        start = time.perf_counter()
+        try:
+            result = await _send(spec, payload)
+        finally:
+            trace.backend += time.perf_counter() - start
+            if spec.admission is not None:
+                spec.admission.release()
         
         if result.get("isError"):
             raise Exception(result["content"][0]["text"])
         
+        if spec.passthrough:
+            return _passthrough(result)
         return result["content"][0]["text"]
     except Exception as e:
         raise Exception(f"Tool call failed: {e}")
 
-def create_tool_func(tool_config):
-    """Create tool function with proper signature"""
-    name = tool_config["name"]
-    endpoint = tool_config["endpoint"]
-    description = tool_config["description"]
-    schema = tool_config.get("input_schema", {})
-    
-    # Build parameter signature
-    properties = schema.get("properties", {})
-    required = schema.get("required", [])
-    params = []
-    
-    for prop_name, prop_def in properties.items():
-        if prop_name in required:
-            params.append(f"{prop_name}: str")
+# Backend content block type -> MCP model (types missing from older mcp releases are skipped)
+_CONTENT_TYPES = {kind: getattr(mcp_types, model) for kind, model in (
+    ("text", "TextContent"), ("image", "ImageContent"), ("audio", "AudioContent"),
+    ("resource", "EmbeddedResource"), ("resource_link", "ResourceLink")) if hasattr(mcp_types, model)}
+
+def _content_block(block: Dict[str, Any]):
+    if block.get("type") == "text":
+        # Hot path for large generated text: no re-validation or copying of the string
+        return mcp_types.TextContent.model_construct(**block)
+    model = _CONTENT_TYPES.get(block.get("type"))
+    if model is None:
+        return mcp_types.TextContent(type="text", text=json.dumps(block))
+    return model.model_validate(block)
+
+def _passthrough(result: Dict[str, Any]):
+    """Forward every backend content block as-is, plus any extra fields as structured content"""
+    blocks = [_content_block(block) for block in result.get("content", [])]
+    if ToolResult is None:
+        return blocks
+    structured = {k: v for k, v in result.items() if k not in ("content", "isError")}
+    return ToolResult(content=blocks, structured_content=structured or None)
+
+async def _send(spec: ToolSpec, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Send with jittered-backoff retries (and hedging) for idempotent tools"""
+    attempts = 1 + _retry_policy.retries if spec.idempotent else 1
+    hedge = _hedge_config if spec.idempotent else {}
+    tried = set()  # retries and hedges prefer replicas not yet used for this call
+    
+    attempt = 0
+    while True:
+        tried_before = len(tried)
+        try:
+            if hedge:
+                return await _post_hedged(spec, payload, hedge, tried)
+            return await _post_replica(spec, payload, tried)
+        except RetryableError as e:
+            if isinstance(e, CircuitOpenError):
+                # Nothing was sent: fail over now (even for non-idempotent tools) if another replica is admitted,
+                # else fail fast instead of backing off against breakers that are open
+                if tried_before < len(tried) and _untried_replica_available(spec, tried):
+                    logger.warning(f"Failing over {payload['tool_name']}: {e}")
+                    continue
+                raise
+            attempt += 1
+            if attempt >= attempts:
+                raise
+            delay = _retry_policy.delay(attempt - 1)
+            logger.warning(f"Retrying {payload['tool_name']} in {delay:.2f}s (attempt {attempt + 1}/{attempts}): {e}")
+            await asyncio.sleep(delay)
+
+def _untried_replica_available(spec: ToolSpec, tried: set) -> bool:
+    return any(r.healthy and r.url not in tried and _breaker(r.url).available for r in spec.balancer.replicas)
+
+def _breaker(endpoint: str) -> CircuitBreaker:
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = _breakers[endpoint] = CircuitBreaker.from_config(_breaker_config)
+        if _shared is not None:
+            breaker.on_open = lambda: _publish_breaker(endpoint, breaker.reset_timeout)
+    return breaker
+
+def _publish_breaker(endpoint: str, reset_timeout: float):
+    """Tell the other workers about a trip without making the failing call wait on the store"""
+    task = asyncio.get_running_loop().create_task(_publish_breaker_async(endpoint, reset_timeout))
+    _publish_tasks.add(task)
+    task.add_done_callback(_publish_tasks.discard)
+
+async def _publish_breaker_async(endpoint: str, reset_timeout: float):
+    try:
+        await _shared.set(f"breaker:{endpoint}", True, reset_timeout)
+    except Exception as e:
+        logger.debug(f"Shared breaker publish failed: {e!r}")
+
+async def _post_replica(spec: ToolSpec, payload: Dict[str, Any], tried: set) -> Dict[str, Any]:
+    """Pick a replica and POST to it, tracking outstanding requests and latency"""
+    balancer = spec.balancer
+    replica = balancer.pick(exclude=tried, available=lambda url: _breaker(url).available)
+    tried.add(replica.url)
+    
+    replica.outstanding += 1
+    start = time.monotonic()
+    try:
+        result = await _post_once(replica.url, payload, spec.batch)
+    finally:
+        replica.outstanding -= 1
+    balancer.observe(replica, time.monotonic() - start)
+    return result
+
+async def _post_json(url: str, body: Any) -> Any:
+    """POST JSON, decode the negotiated response; transport errors and 5xx/429 responses become RetryableError"""
+    local = inprocess.for_url(url)
+    client = _client if local is None else await local.start()
+    try:
+        response = await client.post(url, json=body, headers=wire.REMOTE_HEADERS if local is None else wire.LOCAL_HEADERS)
+    except httpx.TransportError as e:
+        raise RetryableError(f"{type(e).__name__}: {e}") from e
+    
+    if response.status_code >= 500 or response.status_code == 429:
+        raise RetryableError(f"HTTP {response.status_code} from {url}")
+    _response_bytes.inc(wire.media_type(response), response.headers.get("content-encoding", "identity"),
+                        amount=response.num_bytes_downloaded)
+    return wire.decode(response)
+
+async def _post_once(endpoint: str, payload: Dict[str, Any], batch: bool = False) -> Dict[str, Any]:
+    """Single call guarded by the endpoint's circuit breaker (coalesced into a batch when enabled)"""
+    breaker = _breaker(endpoint)
+    probe = breaker.check(endpoint)
+    try:
+        if batch:
+            return await _batcher(endpoint).submit(endpoint, payload)  # the batch records its own outcome
+        try:
+            result = await _post_json(endpoint, payload)
+        except Exception:
+            breaker.record_failure()  # unreadable responses count too, not just RetryableError
+            raise
+        breaker.record_success()
+        return result
+    finally:
+        if probe:
+            breaker.release_probe()  # no-op once recorded; frees the slot if cancelled (hedge loser, disconnect)
+
+def _batch_url(endpoint: str) -> str:
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}{_batching_config.get('path', '/v1/batch')}"
+
+def _batcher(endpoint: str) -> Batcher:
+    url = _batch_url(endpoint)
+    batcher = _batchers.get(url)
+    if batcher is None:
+        batcher = _batchers[url] = Batcher(
+            lambda items: _send_batch(url, items),
+            window=float(_batching_config.get("window_ms", 5)) / 1000,
+            max_batch=int(_batching_config.get("max_batch", 32)),
+        )
+    return batcher
+
+async def _send_batch(url: str, items: list) -> list:
+    """Send coalesced calls as one batch request; breakers count it once per endpoint"""
+    endpoints = {endpoint for endpoint, _ in items}
+    try:
+        if len(items) == 1:
+            endpoint, payload = items[0]
+            results = [await _post_json(endpoint, payload)]
         else:
-            default = prop_def.get("default", '""')
-            if isinstance(default, str):
-                default = f'"{default}"'
-            params.append(f"{prop_name}: str = {default}")
-    
-    # Create function code
-    func_code = f'''
-async def {name}({", ".join(params)}) -> str:
-    """{description}"""
-    args = {{{", ".join([f'"{p}": {p}' for p in properties.keys()])}}}
-    return await call_tool("{endpoint}", "{name}", args)
-'''
-    
-    # Execute and return function
-    namespace = {"call_tool": call_tool}
-    exec(func_code, namespace)
-    return namespace[name]
+            results = await _post_json(url, [payload for _, payload in items])
+            if not isinstance(results, list) or len(results) != len(items):
+                # e.g. {"detail": "Not Found"} from a backend without the batch route
+                raise Exception(f"{url} did not return a list of {len(items)} results: {str(results)[:200]}")
+    except Exception:
+        for endpoint in endpoints:
+            _breaker(endpoint).record_failure()
+        raise
+    for endpoint in endpoints:
+        _breaker(endpoint).record_success()
+    return results
 
-def register_all_tools(mcp) -> int:
-    """Register all tools with MCP server"""
-    tools = load_tool_config()
-    count = 0
+async def _post_hedged(spec: ToolSpec, payload: Dict[str, Any], hedge: Dict[str, Any], tried: set) -> Dict[str, Any]:
+    """Fire a second request (to another replica when possible) if the first is slower than the latency percentile"""
+    delay = spec.balancer.latency.percentile(hedge.get("percentile", 95), hedge.get("min_samples", 20))
+    if delay is None:
+        return await _post_replica(spec, payload, tried)
     
-    for tool_config in tools:
+    tasks = {asyncio.create_task(_post_replica(spec, payload, tried))}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.add(asyncio.create_task(_post_replica(spec, payload, tried)))
+        
+        error = None
+        pending = tasks
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _client_id() -> str:
+    """Fair-queuing key: the MCP client id when given, else its session"""
+    if get_context is None:
+        return "default"
+    try:
+        ctx = get_context()
+        return ctx.client_id or ctx.session_id or "default"
+    except Exception:
+        return "default"
+
+def create_tool_func(spec: ToolSpec):
+    """Build the FastMCP-facing function: typed signature from the compiled schema, no exec"""
+    name = spec.name
+    
+    async def tool_func(**kwargs):
+        return await call_tool(name, kwargs, _client_id())
+    
+    tool_func.__name__ = tool_func.__qualname__ = name
+    tool_func.__doc__ = spec.description
+    tool_func.__signature__ = spec.schema.signature
+    tool_func.__annotations__ = spec.schema.annotations
+    if spec.passthrough:
+        returns = ToolResult if ToolResult is not None else list
+        tool_func.__signature__ = spec.schema.signature.replace(return_annotation=returns)
+        tool_func.__annotations__ = {**spec.schema.annotations, "return": returns}
+    return tool_func
+
+def _unregister(mcp, name: str):
+    """Remove a tool from FastMCP (the API moved between FastMCP versions)"""
+    for owner in (mcp, getattr(mcp, "local_provider", None)):
+        if owner is not None and hasattr(owner, "remove_tool"):
+            owner.remove_tool(name)
+            return
+    getattr(getattr(mcp, "_tool_manager", None), "_tools", {}).pop(name, None)
+
+def _stop_health_check(name: str):
+    task = _health_tasks.pop(name, None)
+    if task is not None:
+        task.cancel()
+
+def _sync_tools(mcp, tool_configs) -> Dict[str, list]:
+    """Diff tool configs against the dispatch table and swap in the result in one assignment.
+    
+    Calls already in flight keep the ToolSpec (endpoints, balancer, options) they started with.
+    """
+    global _tools
+    changes = {"added": [], "updated": [], "removed": [], "unchanged": []}
+    new_tools: Dict[str, ToolSpec] = {}
+    
+    for tool_config in tool_configs:
+        name = tool_config.get("name")
+        old = _tools.get(name)
         try:
-            tool_func = create_tool_func(tool_config)
-            mcp.tool()(tool_func)
-            logger.info(f"Registered: {tool_config['name']}")
-            count += 1
+            if old is not None and old.config == tool_config and old.lb_defaults == _lb_defaults \
+                    and old.limits_defaults == _limits_defaults:
+                new_tools[name] = old
+                changes["unchanged"].append(name)
+                continue
+            
+            spec = ToolSpec(tool_config)
+            if old is None:
+                mcp.tool()(create_tool_func(spec))
+                changes["added"].append(name)
+            else:
+                if not spec.same_interface(old):
+                    _unregister(mcp, name)
+                    mcp.tool()(create_tool_func(spec))
+                if old.cache is not None and spec.cache is not None and old.config.get("cache") == tool_config.get("cache"):
+                    spec.cache = old.cache
+                changes["updated"].append(name)
+            new_tools[name] = spec
+            target = f"in-process {spec.in_process.target}" if spec.in_process else f"{len(spec.balancer.replicas)} replica(s)"
+            logger.info(f"Registered: {spec.name} -> {target}, "
+                        f"{spec.balancer.strategy}" + (", cached" if spec.cache else ""))
         except Exception as e:
-            logger.error(f"Failed to register {tool_config.get('name')}: {e}")
+            logger.error(f"Failed to register {name}: {e}")
+            if old is not None:
+                new_tools[name] = old  # keep serving the last good version
     
-    return count
\ No newline at end of file
+    old_tools, _tools = _tools, new_tools
+    
+    for name in old_tools.keys() - new_tools.keys():
+        _unregister(mcp, name)
+        changes["removed"].append(name)
+    for name in changes["updated"] + changes["removed"]:
+        _stop_health_check(name)
+    for name in changes["added"] + changes["updated"]:
+        _start_health_check(new_tools[name])
+    return changes
+
+def register_all_tools(mcp) -> int:
+    """Register all tools with MCP server"""
+    with _reload_lock:
+        _sync_tools(mcp, load_tool_config())
+    return len(_tools)
+
+def on_startup():
+    """Called on the server's event loop once it is running: starts health checks and shared breaker sync.
+    
+    Later reloads are applied on this loop. Safe to call more than once.
+    """
+    global _loop, _breaker_sync_task
+    _loop = asyncio.get_running_loop()
+    for spec in _tools.values():
+        _start_health_check(spec)
+    if _shared is not None and _breaker_sync_task is None:
+        _breaker_sync_task = _loop.create_task(_sync_shared_breakers())
+
+def reload_tools(mcp) -> Dict[str, list] | None:
+    """Re-read tool.yml and apply only the differences; a bad file leaves the current tools in place.
+    
+    Called from the config watcher thread: the file is read there, but the tool registry is changed on
+    the server's event loop, so it never changes under a list_tools or a call in progress.
+    """
+    try:
+        config = _read_tool_config()
+    except Exception as e:
+        logger.error(f"Reload skipped - cannot read {TOOL_CONFIG_PATH}: {e}")
+        return None
+    loop = _loop
+    if loop is None:  # server not started yet: nothing else touches the registry
+        changes = _apply_reload(mcp, config)
+    else:
+        changes = asyncio.run_coroutine_threadsafe(_apply_reload_on_loop(mcp, config), loop).result()
+    logger.info("Reloaded tools: " + ", ".join(f"{k}={len(v)}" for k, v in changes.items()))
+    return changes
+
+async def _apply_reload_on_loop(mcp, config: Dict[str, Any]) -> Dict[str, list]:
+    return _apply_reload(mcp, config)
+
+def _apply_reload(mcp, config: Dict[str, Any]) -> Dict[str, list]:
+    with _reload_lock:
+        _apply_http_config(config)
+        return _sync_tools(mcp, config.get("tools", []))
@@ -0,0 +1,123 @@
+# utils/admission.py - Per-tool concurrency limits, fair queuing and token-bucket rate limits
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Dict
+
+class OverloadedError(Exception):
+    """Rejected up front: the tool's queue is full or its rate limit cannot be met in time"""
+
+class TokenBucket:
+    """`rate` tokens per second, bursting up to `burst`; reservations may go into debt"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait: float) -> float | None:
+        """Take a token; return how long to wait before using it, or None if that exceeds max_wait"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+class FairLimiter:
+    """At most max_concurrency calls at once; waiters queue per client and are admitted round-robin.
+
+    A client sending a burst only queues behind itself, so one agent cannot starve the others.
+    Once max_queue calls are waiting, new calls fail immediately instead of timing out later.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._queues: OrderedDict[str, deque] = OrderedDict()
+
+    async def acquire(self, client: str):
+        if self.active < self.max_concurrency and not self.waiting:
+            self.active += 1
+            return
+        if self.waiting >= self.max_queue:
+            raise OverloadedError(f"queue full ({self.waiting} waiting, {self.active} running)")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(future)
+        self.waiting += 1
+        try:
+            await future  # release() hands its slot over by resolving this
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # slot was handed over just as we were cancelled
+            else:
+                self._discard(client, future)
+            raise
+
+    def release(self):
+        while self._queues:
+            client, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._queues.move_to_end(client)  # next client's turn
+            else:
+                del self._queues[client]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _discard(self, client: str, future: asyncio.Future):
+        queue = self._queues.get(client)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self.waiting -= 1
+            if not queue:
+                del self._queues[client]
+
+class Admission:
+    """Admission control for one tool: fair concurrency limit, then rate limit"""
+
+    def __init__(self, limiter: FairLimiter | None, bucket: TokenBucket | None, max_wait: float):
+        self.limiter = limiter
+        self.bucket = bucket
+        self.max_wait = max_wait
+
+    @classmethod
+    def from_config(cls, limits: Dict[str, Any]) -> "Admission | None":
+        max_concurrency = limits.get("max_concurrency")
+        rate = limits.get("rate")
+        if not max_concurrency and not rate:
+            return None
+        limiter = None
+        if max_concurrency:
+            limiter = FairLimiter(int(max_concurrency), int(limits.get("max_queue", 4 * int(max_concurrency))))
+        bucket = TokenBucket(float(rate), float(limits.get("burst", max(1.0, float(rate))))) if rate else None
+        return cls(limiter, bucket, float(limits.get("max_wait", 1.0)))
+
+    async def acquire(self, client: str):
+        if self.limiter is not None:
+            await self.limiter.acquire(client)
+        if self.bucket is not None:
+            wait = self.bucket.reserve(self.max_wait)
+            if wait is None:
+                self.release()
+                raise OverloadedError(f"rate limit of {self.bucket.rate:g}/s exceeded")
+            if wait:
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    self.release()
+                    raise
+
+    def release(self):
+        if self.limiter is not None:
+            self.limiter.release()
+
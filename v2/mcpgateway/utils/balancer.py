@@ -0,0 +1,115 @@
+# utils/balancer.py - Replica selection and active health checks
+import random
+import asyncio
+import logging
+import itertools
+from urllib.parse import urlsplit
+from typing import Any, Callable, Dict, Iterable, List
+
+from utils.resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+class Replica:
+    """One backend URL with its load and health bookkeeping"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.ewma: float | None = None  # seconds
+        self.healthy = True
+        self._streak = 0  # consecutive health results opposing the current state
+
+    def observe(self, seconds: float, decay: float):
+        self.ewma = seconds if self.ewma is None else decay * seconds + (1 - decay) * self.ewma
+
+    def stats(self) -> Dict[str, Any]:
+        return {"url": self.url, "healthy": self.healthy, "outstanding": self.outstanding,
+                "ewma_ms": None if self.ewma is None else round(self.ewma * 1000, 2)}
+
+def _round_robin(balancer: "Balancer", candidates: List[Replica]) -> Replica:
+    return candidates[next(balancer._counter) % len(candidates)]
+
+def _least_outstanding(balancer: "Balancer", candidates: List[Replica]) -> Replica:
+    fewest = min(r.outstanding for r in candidates)
+    return random.choice([r for r in candidates if r.outstanding == fewest])
+
+def _ewma(balancer: "Balancer", candidates: List[Replica]) -> Replica:
+    # Power of two choices on latency weighted by queue depth; unmeasured replicas go first
+    pair = random.sample(candidates, 2) if len(candidates) > 1 else candidates
+    return min(pair, key=lambda r: -1.0 if r.ewma is None else r.ewma * (r.outstanding + 1))
+
+STRATEGIES: Dict[str, Callable[["Balancer", List[Replica]], Replica]] = {
+    "round_robin": _round_robin,
+    "least_outstanding": _least_outstanding,
+    "ewma": _ewma,
+}
+
+class Balancer:
+    """Spreads one tool's calls across its replicas"""
+
+    def __init__(self, urls: Iterable[str], strategy: str = "round_robin",
+                 health_check: Dict[str, Any] | None = None, ewma_decay: float = 0.3):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy '{strategy}' (expected one of {list(STRATEGIES)})")
+        self.replicas = [Replica(url) for url in urls]
+        if not self.replicas:
+            raise ValueError("No endpoints configured")
+        self.strategy = strategy
+        self.health_check = health_check or {}
+        self.ewma_decay = ewma_decay
+        self.latency = LatencyTracker()
+        self._select = STRATEGIES[strategy]
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_tool_config(cls, tool_config: Dict[str, Any], defaults: Dict[str, Any]) -> "Balancer":
+        urls = tool_config.get("endpoints") or [tool_config["endpoint"]]
+        lb_config = {**defaults, **(tool_config.get("load_balancing") or {})}
+        return cls(urls, strategy=lb_config.get("strategy", "round_robin"),
+                   health_check=lb_config.get("health_check"),
+                   ewma_decay=float(lb_config.get("ewma_decay", 0.3)))
+
+    def pick(self, exclude: Iterable[str] = (), available: Callable[[str], bool] = lambda url: True) -> Replica:
+        """Choose a replica, preferring healthy ones not already tried; fails open if none qualify"""
+        exclude = set(exclude)
+        candidates = [r for r in self.replicas if r.healthy and r.url not in exclude and available(r.url)]
+        if not candidates:
+            candidates = [r for r in self.replicas if r.healthy] or self.replicas
+        return self._select(self, candidates)
+
+    def observe(self, replica: Replica, seconds: float):
+        replica.observe(seconds, self.ewma_decay)
+        self.latency.record(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"strategy": self.strategy, "replicas": [r.stats() for r in self.replicas]}
+
+    async def run_health_checks(self, client):
+        """Poll each replica's /health, ejecting and readmitting after consecutive results"""
+        interval = float(self.health_check.get("interval", 5.0))
+        path = self.health_check.get("path", "/health")
+        timeout = float(self.health_check.get("timeout", 2.0))
+        unhealthy_threshold = int(self.health_check.get("unhealthy_threshold", 2))
+        healthy_threshold = int(self.health_check.get("healthy_threshold", 2))
+
+        async def check(replica: Replica):
+            parts = urlsplit(replica.url)
+            try:
+                response = await client.get(f"{parts.scheme}://{parts.netloc}{path}", timeout=timeout)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+
+            if ok == replica.healthy:
+                replica._streak = 0
+                return
+            replica._streak += 1
+            if replica._streak >= (healthy_threshold if ok else unhealthy_threshold):
+                replica.healthy = ok
+                replica._streak = 0
+                logger.warning(f"Replica {replica.url} {'readmitted' if ok else 'ejected'}")
+
+        while True:
+            await asyncio.gather(*(check(r) for r in self.replicas))
+            await asyncio.sleep(interval)
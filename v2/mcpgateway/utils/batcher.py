@@ -0,0 +1,63 @@
+# utils/batcher.py - Coalesce concurrent tool calls into one batch request
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+# (endpoint, payload) pairs in, one result dict per pair out (same order)
+BatchSender = Callable[[List[Tuple[str, Dict[str, Any]]]], Awaitable[List[Dict[str, Any]]]]
+
+class Batcher:
+    """Collects calls for one backend over a short window and sends them together"""
+
+    def __init__(self, send: BatchSender, window: float = 0.005, max_batch: int = 32):
+        self.send = send
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._dispatching: set = set()  # held so in-flight batches aren't garbage-collected
+        self.batches = 0
+        self.calls = 0
+
+    async def submit(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((endpoint, payload, future))
+        self.calls += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]):
+        # Callers that gave up (e.g. a losing hedge) are dropped before sending
+        live = [item for item in batch if not item[2].done()]
+        if not live:
+            return
+        error: BaseException = RuntimeError("batch dispatch was interrupted")
+        try:
+            results = await self.send([(endpoint, payload) for endpoint, payload, _ in live])
+            if not isinstance(results, list) or len(results) != len(live):
+                raise ValueError(f"expected a list of {len(live)} batch results, got {str(results)[:100]}")
+            for (_, _, future), result in zip(live, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            error = e
+        finally:
+            # Every caller gets an answer, whatever happened to the batch
+            for _, _, future in live:
+                if not future.done():
+                    future.set_exception(error)
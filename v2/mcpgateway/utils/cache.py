@@ -0,0 +1,122 @@
+# utils/cache.py - Tool result cache with in-flight deduplication
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+def args_key(args: Dict[str, Any]) -> str:
+    """Canonical hash of tool arguments (key order and whitespace independent)"""
+    canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _retrieve(task: asyncio.Task):
+    # Errors are not cached; mark them retrieved so one nobody else awaited isn't logged
+    if not task.cancelled():
+        task.exception()
+
+class ResultCache:
+    """TTL + LRU cache for one tool; identical concurrent calls share one backend request.
+
+    With a `shared` store (multi-worker mode, an AsyncStore) local misses fall through to it and
+    new results are published to it, so workers reuse each other's results.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10000, shared=None, namespace: str = ""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self.namespace = namespace
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    @classmethod
+    def from_config(cls, cache_config: Dict[str, Any]) -> "ResultCache":
+        return cls(ttl=float(cache_config.get("ttl", 300)),
+                   max_entries=int(cache_config.get("max_entries", 10000)))
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_call(self, args: Dict[str, Any], call: Callable[[], Awaitable[Any]]) -> Any:
+        key = args_key(args)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        # The call runs as its own task; callers await it shielded, so one that disconnects doesn't cancel it for the rest
+        task = asyncio.create_task(self._call(key, call))
+        self._inflight[key] = task
+        task.add_done_callback(_retrieve)
+        return await asyncio.shield(task)
+
+    async def _call(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        # The shared tier is checked inside the single flight, so concurrent misses share one lookup too
+        try:
+            if self.shared is not None:
+                value = await self._shared_get(key)
+                if value is not None:
+                    self.shared_hits += 1
+                    self.set(key, value)
+                    return value
+            self.misses += 1
+            value = await call()
+            self.set(key, value)
+            if self.shared is not None:
+                await self._shared_set(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _shared_get(self, key: str) -> Any | None:
+        try:
+            return await self.shared.get(self.namespace + key)
+        except Exception as e:
+            logger.debug(f"Shared cache read failed: {e!r}")
+            return None
+
+    async def _shared_set(self, key: str, value: Any):
+        try:
+            await self.shared.set(self.namespace + key, value, self.ttl)
+        except Exception as e:
+            logger.debug(f"Shared cache write failed: {e!r}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,111 @@
+# utils/inprocess.py - Co-located tool apps: load an ASGI app into the gateway and call it without a network hop
+import os
+import re
+import sys
+import asyncio
+import logging
+import importlib
+import importlib.util
+import httpx
+from typing import Dict
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+class InProcessApp:
+    """A tool's ASGI app running inside the gateway, reached through an in-memory httpx transport.
+
+    The app's lifespan startup runs on the first call, so tool services that
+    open clients or start background tasks behave as they do when run on their own.
+    """
+
+    def __init__(self, target: str, app):
+        self.target = target
+        self.app = app
+        self.host = _host_name(target)
+        self.client: httpx.AsyncClient | None = None
+        self._lifespan = None
+        self._lock: asyncio.Lock | None = None
+
+    def url(self, path: str) -> str:
+        return f"http://{self.host}{path}"
+
+    async def start(self) -> httpx.AsyncClient:
+        if self.client is not None:
+            return self.client
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.client is None:
+                lifespan_context = getattr(getattr(self.app, "router", None), "lifespan_context", None)
+                if lifespan_context is not None:
+                    lifespan = lifespan_context(self.app)
+                    await lifespan.__aenter__()
+                    self._lifespan = lifespan
+                # App errors become 500 responses, as they would over the network
+                transport = httpx.ASGITransport(app=self.app, raise_app_exceptions=False)
+                self.client = httpx.AsyncClient(transport=transport, base_url=f"http://{self.host}")
+                logger.info(f"Started in-process tool app {self.target}")
+        return self.client
+
+# target -> loaded app, and URL host -> app (so the HTTP call path can route by URL)
+_apps: Dict[str, InProcessApp] = {}
+_hosts: Dict[str, InProcessApp] = {}
+
+def _host_name(target: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", target.lower()).strip("-")
+    return f"{slug[-50:].strip('-') or 'app'}.inprocess"
+
+def _load_file(path: str):
+    """Import a tool's app.py under a unique name, with its own copies of its sibling modules.
+
+    Tool services use the same top-level module names (app, cache, ...), so siblings imported
+    while loading are removed from sys.modules afterwards; the loaded app keeps its references.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    local = {os.path.splitext(entry)[0] for entry in os.listdir(directory) if entry.endswith(".py")}
+    local |= {entry for entry in os.listdir(directory) if os.path.isfile(os.path.join(directory, entry, "__init__.py"))}
+    hidden = {name: module for name, module in sys.modules.items() if name.split(".")[0] in local}
+    for name in hidden:
+        del sys.modules[name]
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"_inprocess_{re.sub(r'[^A-Za-z0-9_]', '_', os.path.basename(directory))}_{stem}"
+    sys.path.insert(0, directory)
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        return module
+    except BaseException:
+        sys.modules.pop(name, None)
+        raise
+    finally:
+        sys.path.remove(directory)
+        for loaded in [n for n in sys.modules if n.split(".")[0] in local]:
+            del sys.modules[loaded]
+        sys.modules.update(hidden)
+
+def load(target: str, base_dir: str = ".") -> InProcessApp:
+    """Load `module:attr` or `path/to/app.py:attr` (relative to base_dir) once per target"""
+    existing = _apps.get(target)
+    if existing is not None:
+        return existing
+    module_ref, _, attr = target.rpartition(":")
+    if not module_ref or not attr:
+        raise ValueError(f"in_process target must be 'module:attr' or 'path/to/app.py:attr', got '{target}'")
+    if module_ref.endswith(".py") or "/" in module_ref or os.sep in module_ref:
+        module = _load_file(os.path.join(base_dir, module_ref))
+    else:
+        module = importlib.import_module(module_ref)
+    app = InProcessApp(target, getattr(module, attr))
+    _apps[target] = _hosts[app.host] = app
+    return app
+
+def for_url(url: str) -> InProcessApp | None:
+    """The in-process app serving this URL, or None for a remote endpoint"""
+    if not _hosts:
+        return None
+    return _hosts.get(urlsplit(url).hostname or "")
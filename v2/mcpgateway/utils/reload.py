@@ -0,0 +1,53 @@
+# utils/reload.py - Trigger tool.yml reloads on file change or SIGHUP
+import os
+import signal
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+class ConfigWatcher(threading.Thread):
+    """Background thread that calls `on_change` when the file changes or `trigger()` is called.
+
+    `on_change` runs on this thread; it is responsible for handing any shared-state changes to the
+    thread that owns that state.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], object], interval: float = 2.0, watch: bool = True):
+        super().__init__(name="config-watcher", daemon=True)
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.watch = watch
+        self._triggered = threading.Event()
+        self._last = self._stamp()
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            return None
+
+    def trigger(self):
+        self._triggered.set()
+
+    def install_sighup(self):
+        """Reload on SIGHUP (must be called from the main thread)"""
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.trigger())
+
+    def run(self):
+        while True:
+            triggered = self._triggered.wait(self.interval if self.watch else None)
+            self._triggered.clear()
+            stamp = self._stamp()
+            if not triggered and (stamp == self._last or stamp is None):
+                continue
+            self._last = stamp
+            logger.info(f"Reloading {self.path} ({'signal' if triggered else 'file changed'})")
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.error(f"Reload of {self.path} failed: {e}")
@@ -0,0 +1,111 @@
+# utils/resilience.py - Retry backoff, hedging delays and circuit breakers
+import time
+import random
+from collections import deque
+from typing import Any, Callable, Dict
+
+class RetryableError(Exception):
+    """Transport failure or 5xx/429 response - safe to retry for idempotent tools"""
+
+class CircuitOpenError(RetryableError):
+    """Raised instead of calling an endpoint whose breaker is open (nothing was sent, so another replica may be tried)"""
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, retries: int = 3, base: float = 0.1, max_delay: float = 2.0):
+        self.retries = retries
+        self.base = base
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, http_config: Dict[str, Any]) -> "RetryPolicy":
+        backoff = http_config.get("backoff", {})
+        return cls(retries=int(http_config.get("retries", 0)),
+                   base=float(backoff.get("base", 0.1)),
+                   max_delay=float(backoff.get("max", 2.0)))
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base * (2 ** attempt)))
+
+class LatencyTracker:
+    """Sliding window of recent successful latencies for one endpoint"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> float | None:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+        self.on_open: Callable[[], None] | None = None  # e.g. publish to other workers
+
+    @classmethod
+    def from_config(cls, breaker_config: Dict[str, Any]) -> "CircuitBreaker":
+        return cls(failure_threshold=int(breaker_config.get("failure_threshold", 5)),
+                   reset_timeout=float(breaker_config.get("reset_timeout", 30.0)))
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def available(self) -> bool:
+        """True if check() would let a call through right now"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._probing)
+
+    def check(self, endpoint: str) -> bool:
+        """Raise CircuitOpenError unless a call may go through; True if this call is the half-open probe.
+
+        The probe must end in record_success(), record_failure() or release_probe(), or the
+        endpoint stays blocked.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError(f"circuit open for {endpoint}")
+        if state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Give up the probe slot without an outcome (probe cancelled), so the next call probes instead"""
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.on_open is not None:
+                self.on_open()
+        self._probing = False
+
+    def adopt_open(self, remaining: float):
+        """Open because another worker saw the endpoint fail; probe once `remaining` seconds pass"""
+        if self.state == "closed":
+            self.opened_at = time.monotonic() - max(0.0, self.reset_timeout - remaining)
@@ -0,0 +1,135 @@
+# utils/schema.py - Compile a tool's input_schema into a typed signature + validator
+import inspect
+from typing import Annotated, Any, Callable, Dict, List, Literal, Optional
+from pydantic import Field, WithJsonSchema
+
+class ArgumentError(ValueError):
+    """Tool arguments don't match the tool's input_schema"""
+
+_TRUE = {"true", "1", "yes", "on"}
+_FALSE = {"false", "0", "no", "off"}
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in _TRUE | _FALSE:
+        return value.lower() in _TRUE
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f"expected boolean, got {value!r}")
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"expected integer, got {value!r}")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"expected integer, got {value!r}")
+    return int(value)
+
+def _to_str(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"expected string, got {type(value).__name__}")
+    return str(value)
+
+def _expect(kind: type) -> Callable[[Any], Any]:
+    def check(value: Any) -> Any:
+        if not isinstance(value, kind):
+            raise ValueError(f"expected {kind.__name__}, got {type(value).__name__}")
+        return value
+    return check
+
+# JSON schema type -> (python annotation, coercer)
+_TYPES: Dict[str, tuple] = {
+    "string": (str, _to_str),
+    "integer": (int, _to_int),
+    "number": (float, float),
+    "boolean": (bool, _to_bool),
+    "array": (list, _expect(list)),
+    "object": (dict, _expect(dict)),
+}
+
+class _Param:
+    __slots__ = ("name", "annotation", "coerce", "required", "default", "enum", "minimum", "maximum",
+                 "items", "fields")
+
+    def __init__(self, name: str, prop: Dict[str, Any], required: bool):
+        annotation, coerce = _TYPES.get(prop.get("type", "string"), (Any, lambda v: v))
+        self.name = name
+        self.coerce = coerce
+        self.required = required
+        self.enum = prop.get("enum")
+        self.minimum = prop.get("minimum")
+        self.maximum = prop.get("maximum")
+        self.annotation = Literal[tuple(self.enum)] if self.enum else annotation
+
+        # Array items and object properties are checked recursively and published as written in tool.yml
+        items = prop.get("items")
+        self.items = _Param(name, items, True) if annotation is list and isinstance(items, dict) and items else None
+        self.fields = ToolSchema(prop) if annotation is dict and prop.get("properties") else None
+        if self.items is not None or self.fields is not None:
+            self.annotation = Annotated[annotation, WithJsonSchema({k: v for k, v in prop.items() if k != "default"})]
+        self.default = coerce(prop["default"]) if "default" in prop else None
+        if not required and self.default is None:
+            self.annotation = Optional[self.annotation]
+
+        # Carry description and bounds into the schema FastMCP publishes
+        field = {k: v for k, v in (("description", prop.get("description")),
+                                   ("ge", self.minimum), ("le", self.maximum)) if v is not None}
+        if field:
+            self.annotation = Annotated[self.annotation, Field(**field)]
+
+    def check(self, value: Any, label: str | None = None) -> Any:
+        label = label or self.name
+        try:
+            value = self.coerce(value)
+        except (TypeError, ValueError) as e:
+            raise ArgumentError(f"'{label}': {e}") from None
+        if self.enum is not None and value not in self.enum:
+            raise ArgumentError(f"'{label}' must be one of {self.enum}, got {value!r}")
+        if self.minimum is not None and value < self.minimum:
+            raise ArgumentError(f"'{label}' must be >= {self.minimum}, got {value!r}")
+        if self.maximum is not None and value > self.maximum:
+            raise ArgumentError(f"'{label}' must be <= {self.maximum}, got {value!r}")
+        if self.items is not None:
+            value = [self.items.check(item, f"{label}[{i}]") for i, item in enumerate(value)]
+        if self.fields is not None:
+            value = self.fields.validate(value, f"{label}.")
+        return value
+
+class ToolSchema:
+    """input_schema compiled once: a typed inspect.Signature plus a coercing validator"""
+
+    def __init__(self, input_schema: Dict[str, Any]):
+        properties = input_schema.get("properties", {})
+        required = set(input_schema.get("required", []))
+        self.params: List[_Param] = [_Param(name, prop or {}, name in required) for name, prop in properties.items()]
+        self._names = frozenset(p.name for p in self.params)
+
+        # Keyword-only, so required/optional parameters can keep schema order
+        self.signature = inspect.Signature([
+            inspect.Parameter(p.name, inspect.Parameter.KEYWORD_ONLY, annotation=p.annotation,
+                              default=inspect.Parameter.empty if p.required else p.default)
+            for p in self.params
+        ], return_annotation=str)
+        self.annotations = {p.name: p.annotation for p in self.params}
+        self.annotations["return"] = str
+
+    def validate(self, args: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+        """Coerce and check arguments, filling defaults; omits optional args without a default
+
+        prefix labels errors inside nested objects, e.g. "streams[0]." for an array item.
+        """
+        unknown = args.keys() - self._names
+        if unknown:
+            raise ArgumentError(f"Unknown argument(s): {', '.join(prefix + k for k in sorted(unknown))}")
+
+        validated = {}
+        for param in self.params:
+            value = args.get(param.name)
+            if value is None:
+                if param.required:
+                    raise ArgumentError(f"Missing required argument '{prefix}{param.name}'")
+                if param.default is not None:
+                    validated[param.name] = param.default
+                continue
+            validated[param.name] = param.check(value, prefix + param.name)
+        return validated
@@ -0,0 +1,115 @@
+# utils/shared_state.py - Optional cross-process store over a Unix socket
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Environment handed from the supervisor to its workers
+SOCKET_ENV = "MCPGATEWAY_STATE_SOCKET"
+AUTHKEY_ENV = "MCPGATEWAY_STATE_AUTHKEY"
+
+class SharedStore:
+    """TTL'd key/value map living in the supervisor; workers reach it through a manager proxy"""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()  # the manager serves each client connection on its own thread
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def items(self, prefix: str) -> Dict[str, tuple[float, Any]]:
+        """Unexpired entries under a prefix as {key: (expires_at, value)}"""
+        now = time.time()
+        with self._lock:
+            return {k: v for k, v in self._data.items() if k.startswith(prefix) and v[0] > now}
+
+class AsyncStore:
+    """Worker-side view of the store: each proxy call runs on a small dedicated thread pool with a timeout.
+
+    Proxy calls are blocking socket round trips to the supervisor. Running them off the event loop, with a
+    bounded pool and a deadline, keeps a slow or dead supervisor from stalling the requests in this worker.
+    A call that times out raises asyncio.TimeoutError; callers treat the store as a best-effort tier.
+    """
+
+    def __init__(self, proxy, timeout: float = 0.5, max_workers: int = 4):
+        self._proxy = proxy
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="shared-state")
+
+    async def _call(self, method: str, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(self._executor, getattr(self._proxy, method), *args)
+        return await asyncio.wait_for(call, self.timeout)
+
+    async def get(self, key: str) -> Any:
+        return await self._call("get", key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._call("set", key, value, ttl)
+
+    async def delete(self, key: str):
+        await self._call("delete", key)
+
+    async def items(self, prefix: str) -> Dict[str, tuple[float, Any]]:
+        return await self._call("items", prefix)
+
+class _StoreManager(BaseManager):
+    pass
+
+_store: SharedStore | None = None
+
+def _init_store(max_entries: int):
+    global _store
+    _store = SharedStore(max_entries)
+
+def _get_store() -> SharedStore:
+    return _store
+
+def serve_store(address: str, authkey: bytes, max_entries: int = 100000) -> BaseManager:
+    """Start the store server process (supervisor side)"""
+    _StoreManager.register("store", callable=_get_store)
+    if os.path.exists(address):
+        os.unlink(address)
+    manager = _StoreManager(address=address, authkey=authkey)
+    manager.start(_init_store, (max_entries,))
+    logger.info(f"Shared state store listening on {address}")
+    return manager
+
+def connect_store_from_env(timeout: float = 0.5) -> AsyncStore | None:
+    """Return the store when this process was started by a supervisor with shared state, else None"""
+    address = os.getenv(SOCKET_ENV)
+    if not address:
+        return None
+    _StoreManager.register("store")
+    manager = _StoreManager(address=address, authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]))
+    manager.connect()
+    return AsyncStore(manager.store(), timeout)
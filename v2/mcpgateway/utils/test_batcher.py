@@ -0,0 +1,100 @@
+# utils/test_batcher.py - Batch coalescing and how callers are answered when a batch goes wrong
+import asyncio
+import pytest
+from utils.batcher import Batcher
+
+def run_batch(send, count: int = 3, **kwargs):
+    """Submit `count` calls inside one window; each caller's result or exception, in order"""
+    async def scenario():
+        batcher = Batcher(send, window=0.001, **kwargs)
+        calls = [batcher.submit("http://backend/v1/tool", {"n": n}) for n in range(count)]
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), timeout=1.0)
+    return asyncio.run(scenario())
+
+def test_results_are_returned_in_order():
+    sent = []
+    async def send(items):
+        sent.append(len(items))
+        return [{"n": payload["n"]} for _, payload in items]
+    assert run_batch(send) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert sent == [3]
+
+def test_max_batch_flushes_early():
+    sent = []
+    async def send(items):
+        sent.append(len(items))
+        return [{} for _ in items]
+    run_batch(send, count=5, max_batch=2)
+    assert sent == [2, 2, 1]
+
+@pytest.mark.parametrize("response", [{"detail": "Not Found"}, [{"n": 0}], [{}, {}, {}, {}], None])
+def test_malformed_batch_response_fails_every_caller(response):
+    async def send(items):
+        return response
+    results = run_batch(send)
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_send_error_fails_every_caller():
+    async def send(items):
+        raise ConnectionError("backend down")
+    results = run_batch(send)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+def test_cancelled_dispatch_still_answers_callers():
+    async def scenario():
+        started = asyncio.Event()
+        async def send(items):
+            started.set()
+            await asyncio.sleep(10)
+        batcher = Batcher(send, window=0.001)
+        calls = asyncio.gather(*(batcher.submit("http://backend/v1/tool", {}) for _ in range(2)),
+                               return_exceptions=True)
+        await started.wait()
+        for task in asyncio.all_tasks():
+            if task.get_coro().__name__ == "_dispatch":
+                task.cancel()
+        return await asyncio.wait_for(calls, timeout=1.0)
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_callers_that_gave_up_are_not_sent():
+    sent = []
+    async def scenario():
+        async def send(items):
+            sent.append([payload["n"] for _, payload in items])
+            return [{"n": payload["n"]} for _, payload in items]
+        batcher = Batcher(send, window=0.01)
+        gone = asyncio.create_task(batcher.submit("http://backend/v1/tool", {"n": 0}))
+        kept = asyncio.create_task(batcher.submit("http://backend/v1/tool", {"n": 1}))
+        await asyncio.sleep(0)
+        gone.cancel()  # e.g. the losing hedge
+        return await kept
+    assert asyncio.run(scenario()) == {"n": 1}
+    assert sent == [[1]]
+
+def test_gateway_rejects_non_list_batch_response(monkeypatch):
+    import tool
+    monkeypatch.setattr(tool, "_breakers", {})
+    async def post(url, body):
+        return {"detail": "Not Found"}
+    monkeypatch.setattr(tool, "_post_json", post)
+    endpoint = "http://backend/v1/tool"
+    with pytest.raises(Exception, match="did not return a list of 2 results"):
+        asyncio.run(tool._send_batch("http://backend/v1/batch", [(endpoint, {}), (endpoint, {})]))
+    assert tool._breakers[endpoint].failures == 1
+
+def test_dispatch_tasks_are_held_until_done():
+    async def scenario():
+        release = asyncio.Event()
+        async def send(items):
+            await release.wait()
+            return [{} for _ in items]
+        batcher = Batcher(send, window=0.001)
+        call = asyncio.create_task(batcher.submit("http://backend/v1/tool", {}))
+        await asyncio.sleep(0.01)
+        held = len(batcher._dispatching)
+        release.set()
+        await call
+        await asyncio.sleep(0)
+        return held, len(batcher._dispatching)
+    assert asyncio.run(scenario()) == (1, 0)
@@ -0,0 +1,63 @@
+# utils/test_cache.py - Result cache single flight and the shared (cross-worker) tier
+import time
+import asyncio
+from utils.cache import ResultCache, args_key
+from utils.shared_state import AsyncStore, SharedStore
+
+class SlowStore(SharedStore):
+    """A supervisor that takes `delay` seconds to answer each call"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def get(self, key):
+        time.sleep(self.delay)
+        return super().get(key)
+
+    def set(self, key, value, ttl):
+        time.sleep(self.delay)
+        super().set(key, value, ttl)
+
+def test_shared_hit_is_reused_and_misses_share_one_call():
+    async def scenario():
+        store = AsyncStore(SharedStore())
+        await store.set("cache:t:" + args_key({"q": "hit"}), "shared", 60)
+        cache = ResultCache(shared=store, namespace="cache:t:")
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "fresh"
+
+        assert await cache.get_or_call({"q": "hit"}, call) == "shared"
+        results = await asyncio.gather(*(cache.get_or_call({"q": "miss"}, call) for _ in range(5)))
+        assert results == ["fresh"] * 5 and len(calls) == 1
+        assert (cache.shared_hits, cache.misses, cache.coalesced) == (1, 1, 4)
+
+    asyncio.run(scenario())
+
+def test_slow_store_does_not_block_the_event_loop():
+    async def scenario():
+        cache = ResultCache(shared=AsyncStore(SlowStore(delay=0.5), timeout=0.05))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        async def call():
+            return "fresh"
+
+        background = asyncio.create_task(ticker())
+        start = time.monotonic()
+        assert await cache.get_or_call({"q": 1}, call) == "fresh"
+        elapsed = time.monotonic() - start
+        background.cancel()
+        assert elapsed < 0.4  # the read and the write each give up after the timeout
+        assert ticks >= 5     # and the loop kept running meanwhile
+
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+# utils/test_resilience.py - Circuit breaker states and probe handling on the gateway call path
+import asyncio
+import pytest
+import tool
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryableError
+
+ENDPOINT = "http://replica-a/v1/echo"
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    return breaker
+
+def test_opens_after_threshold_and_half_opens_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check(ENDPOINT)
+    breaker.opened_at -= 60.0
+    assert breaker.state == "half_open"
+
+def test_half_open_admits_one_probe():
+    breaker = half_open_breaker()
+    assert breaker.check(ENDPOINT) is True
+    assert not breaker.available
+    with pytest.raises(CircuitOpenError):
+        breaker.check(ENDPOINT)
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.check(ENDPOINT) is False
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = half_open_breaker()
+    breaker.check(ENDPOINT)
+    breaker.release_probe()
+    assert breaker.available
+    assert breaker.check(ENDPOINT) is True
+
+def test_circuit_open_is_retryable():
+    assert issubclass(CircuitOpenError, RetryableError)
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(tool, "_breakers", {})
+    monkeypatch.setattr(tool, "_breaker_config", {"failure_threshold": 1, "reset_timeout": 0.0})
+    return tool._breakers
+
+def test_cancelled_probe_releases_the_slot(breakers, monkeypatch):
+    async def slow_post(url, body):
+        await asyncio.sleep(10)
+    monkeypatch.setattr(tool, "_post_json", slow_post)
+
+    async def scenario():
+        tool._breaker(ENDPOINT).record_failure()
+        probe = asyncio.create_task(tool._post_once(ENDPOINT, {}))
+        await asyncio.sleep(0)
+        assert not breakers[ENDPOINT].available  # probe in flight
+        probe.cancel()  # e.g. the losing hedge
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+    asyncio.run(scenario())
+    assert breakers[ENDPOINT].available
+
+def test_non_retryable_probe_error_counts_as_failure(breakers, monkeypatch):
+    async def bad_post(url, body):
+        raise ValueError("not JSON")
+    monkeypatch.setattr(tool, "_post_json", bad_post)
+
+    async def scenario():
+        breaker = tool._breaker(ENDPOINT)
+        breaker.reset_timeout = 60.0
+        breaker.record_failure()
+        breaker.opened_at -= 60.0
+        with pytest.raises(ValueError):
+            await tool._post_once(ENDPOINT, {})
+        assert breaker.state == "open"  # reopened, not stuck probing
+        breaker.opened_at -= 60.0
+        assert breaker.available
+    asyncio.run(scenario())
+
+def test_open_circuit_fails_over_to_another_replica(breakers, monkeypatch):
+    sent = []
+    async def post(url, body):
+        sent.append(url)
+        return {"content": [{"type": "text", "text": url}], "isError": False}
+    monkeypatch.setattr(tool, "_post_json", post)
+
+    class Tripped(CircuitBreaker):
+        """Reports available but trips on check, as when it opens between pick and send"""
+        def check(self, endpoint):
+            raise CircuitOpenError(f"circuit open for {endpoint}")
+
+    spec = tool.ToolSpec({"name": "echo", "endpoints": ["http://replica-a/v1/echo", "http://replica-b/v1/echo"]})
+    breakers["http://replica-a/v1/echo"] = Tripped()
+    assert not spec.idempotent  # nothing was sent, so failing over is safe without retries
+    for _ in range(4):
+        result = asyncio.run(tool._send(spec, {"tool_name": "echo"}))
+        assert result["content"][0]["text"] == "http://replica-b/v1/echo"
+    assert sent == ["http://replica-b/v1/echo"] * 4
+
+def test_open_circuit_on_only_replica_fails_fast(breakers, monkeypatch):
+    sleeps = []
+    async def sleep(delay):
+        sleeps.append(delay)
+    monkeypatch.setattr(tool.asyncio, "sleep", sleep)
+    monkeypatch.setattr(tool, "_retry_policy", tool.RetryPolicy(retries=3))
+    monkeypatch.setattr(tool, "_hedge_config", {})
+    async def post(url, body):
+        raise AssertionError("nothing may be sent through an open circuit")
+    monkeypatch.setattr(tool, "_post_json", post)
+
+    spec = tool.ToolSpec({"name": "echo", "endpoint": ENDPOINT, "idempotent": True})
+    breakers[ENDPOINT] = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breakers[ENDPOINT].record_failure()
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(tool._send(spec, {"tool_name": "echo"}))
+    assert sleeps == []  # no backoff against a breaker that is meant to fail fast
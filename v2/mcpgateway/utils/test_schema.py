@@ -0,0 +1,49 @@
+# test_schema.py - input_schema compilation: coercion, nested items and the published JSON schema
+import pytest
+from pydantic import TypeAdapter
+from utils.schema import ArgumentError, ToolSchema
+
+BUNDLE = {
+    "type": "object",
+    "properties": {
+        "streams": {
+            "type": "array",
+            "description": "Streams to generate",
+            "items": {
+                "type": "object",
+                "properties": {"streamid": {"type": "string"}, "sql_content": {"type": "string"}},
+                "required": ["streamid", "sql_content"],
+            },
+        },
+        "limit": {"type": "integer", "minimum": 1, "default": 10},
+    },
+    "required": ["streams"],
+}
+
+def test_valid_items_pass_and_defaults_fill():
+    args = ToolSchema(BUNDLE).validate({"streams": [{"streamid": "a", "sql_content": "select 1"}]})
+    assert args == {"streams": [{"streamid": "a", "sql_content": "select 1"}], "limit": 10}
+
+@pytest.mark.parametrize("streams, message", [
+    ([1], "'streams[0]': expected dict, got int"),
+    ([{"streamid": "a", "sql_content": "x"}, "x"], "'streams[1]': expected dict, got str"),
+    ([{"foo": 1}], "Unknown argument(s): streams[0].foo"),
+    ([{"streamid": "a"}], "Missing required argument 'streams[0].sql_content'"),
+    ([{"streamid": {}, "sql_content": "x"}], "'streams[0].streamid': expected string, got dict"),
+    ("x", "'streams': expected list, got str"),
+])
+def test_bad_items_are_rejected(streams, message):
+    with pytest.raises(ArgumentError) as e:
+        ToolSchema(BUNDLE).validate({"streams": streams})
+    assert str(e.value) == message
+
+def test_item_values_are_coerced():
+    schema = ToolSchema({"properties": {"ids": {"type": "array", "items": {"type": "integer", "maximum": 5}}}})
+    assert schema.validate({"ids": ["1", 2.0]}) == {"ids": [1, 2]}
+    with pytest.raises(ArgumentError, match=r"'ids\[1\]' must be <= 5"):
+        schema.validate({"ids": [1, 6]})
+
+def test_published_schema_keeps_items():
+    published = TypeAdapter(ToolSchema(BUNDLE).annotations["streams"]).json_schema()
+    assert published["items"] == BUNDLE["properties"]["streams"]["items"]
+    assert published["description"] == "Streams to generate"
@@ -0,0 +1,265 @@
+# utils/workers.py - Multi-process gateway: worker supervisor + session-sticky router
+import os
+import re
+import sys
+import time
+import signal
+import socket
+import asyncio
+import logging
+import secrets
+import subprocess
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from common.metrics import CONTENT_TYPE, merge
+from utils.shared_state import AUTHKEY_ENV, SOCKET_ENV, serve_store
+
+logger = logging.getLogger(__name__)
+
+WORKER_PORT_ENV = "MCPGATEWAY_WORKER_PORT"
+SESSION_HEADER = "mcp-session-id"
+_SSE_SESSION = re.compile(rb"session_id=([0-9A-Za-z_-]+)")
+_HOP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "te", "trailer",
+                "upgrade", "proxy-authorization", "proxy-authenticate", "content-length"}
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Worker:
+    """One gateway process listening on a private loopback port"""
+
+    def __init__(self, port: int, process: subprocess.Popen):
+        self.port = port
+        self.process = process
+        self.url = f"http://127.0.0.1:{port}"
+        self.sessions: set = set()
+        self.inflight = 0
+        self.requests = 0
+        self.draining_since: float | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+class Supervisor:
+    """Runs N gateway workers behind a router that pins each MCP session to one worker.
+
+    SSE sessions are learned from the `endpoint` event (session_id=...) and streamable-HTTP
+    sessions from the mcp-session-id response header; later requests carrying that id go to
+    the same worker. Workers are recycled after max_requests by draining them first.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        server = config["server"]
+        self.host = server["host"]
+        self.port = server["port"]
+        self.worker_count = int(server.get("workers", 1))
+        self.max_requests = int(server.get("max_requests", 0))
+        self.drain_timeout = float(server.get("drain_timeout", 30))
+        self.session_idle_timeout = float(server.get("session_idle_timeout", 3600))
+        self.shared_state = config.get("shared_state") or {}
+
+        self._workers: List[Worker] = []
+        self._sessions: Dict[str, Worker] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._worker_env: Dict[str, str] = {}
+        self._client: httpx.AsyncClient | None = None
+        self._store = None
+
+    # -- worker lifecycle -------------------------------------------------
+
+    def _spawn(self) -> Worker:
+        port = _free_port()
+        env = {**os.environ, **self._worker_env, WORKER_PORT_ENV: str(port)}
+        process = subprocess.Popen([sys.executable, os.path.abspath(sys.argv[0])], env=env)
+        logger.info(f"Started worker pid={process.pid} on port {port}")
+        return Worker(port, process)
+
+    async def _wait_ready(self, worker: Worker, timeout: float = 30.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.alive:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", worker.port)
+                writer.close()
+                return True
+            except OSError:
+                await asyncio.sleep(0.1)
+        return False
+
+    async def _start_worker(self) -> Worker:
+        worker = self._spawn()
+        if not await self._wait_ready(worker):
+            logger.error(f"Worker pid={worker.process.pid} did not become ready")
+        self._workers.append(worker)
+        return worker
+
+    async def _retire(self, worker: Worker):
+        self._workers.remove(worker)
+        for session_id in list(worker.sessions):
+            self._unbind(session_id)
+        if worker.alive:
+            worker.process.terminate()  # uvicorn shuts down gracefully on SIGTERM
+            try:
+                await asyncio.to_thread(worker.process.wait, 10)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+        logger.info(f"Retired worker pid={worker.process.pid}")
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for worker in list(self._workers):
+                if not worker.alive:
+                    logger.warning(f"Worker pid={worker.process.pid} exited ({worker.process.returncode})")
+                    await self._retire(worker)
+                    if worker.draining_since is None:
+                        await self._start_worker()
+                elif worker.draining_since is None and self.max_requests and worker.requests >= self.max_requests:
+                    # Replacement first, so capacity never dips during recycling
+                    worker.draining_since = now
+                    await self._start_worker()
+                elif worker.draining_since is not None and (
+                        (not worker.sessions and worker.inflight == 0) or now - worker.draining_since > self.drain_timeout):
+                    await self._retire(worker)
+
+            for session_id, seen in list(self._last_seen.items()):
+                if now - seen > self.session_idle_timeout:
+                    self._unbind(session_id)
+
+    # -- session affinity -------------------------------------------------
+
+    def _bind(self, session_id: str, worker: Worker):
+        self._sessions[session_id] = worker
+        self._last_seen[session_id] = time.monotonic()
+        worker.sessions.add(session_id)
+
+    def _unbind(self, session_id: str):
+        worker = self._sessions.pop(session_id, None)
+        self._last_seen.pop(session_id, None)
+        if worker is not None:
+            worker.sessions.discard(session_id)
+
+    def _pick(self) -> Worker | None:
+        candidates = [w for w in self._workers if w.alive and w.draining_since is None]
+        return min(candidates, key=lambda w: (len(w.sessions), w.inflight), default=None)
+
+    async def metrics(self, request: Request) -> Response:
+        """Every worker's /metrics, told apart by a worker=<pid> label"""
+        workers = [w for w in self._workers if w.alive]
+
+        async def scrape(worker: Worker) -> str:
+            try:
+                response = await self._client.get(f"{worker.url}/metrics", timeout=5.0)
+                return response.text if response.status_code == 200 else ""
+            except httpx.TransportError:
+                return ""
+
+        texts = await asyncio.gather(*(scrape(w) for w in workers))
+        return Response(merge({str(w.process.pid): t for w, t in zip(workers, texts)}, "worker"),
+                        media_type=CONTENT_TYPE)
+
+    async def proxy(self, request: Request) -> Response:
+        session_id = request.query_params.get("session_id") or request.headers.get(SESSION_HEADER)
+        if session_id:
+            worker = self._sessions.get(session_id)
+            if worker is None:
+                return Response("Unknown or expired session", status_code=404)
+            self._last_seen[session_id] = time.monotonic()
+        else:
+            worker = self._pick()
+            if worker is None:
+                return Response("No gateway workers available", status_code=503)
+
+        url = f"{worker.url}{request.url.path}" + (f"?{request.url.query}" if request.url.query else "")
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS]
+        upstream = self._client.build_request(request.method, url, headers=headers, content=request.stream())
+
+        worker.requests += 1
+        worker.inflight += 1
+        try:
+            response = await self._client.send(upstream, stream=True)
+        except httpx.TransportError as e:
+            worker.inflight -= 1
+            return Response(f"Worker unavailable: {e}", status_code=502)
+
+        new_session = response.headers.get(SESSION_HEADER)
+        if new_session and new_session not in self._sessions:
+            self._bind(new_session, worker)
+        if request.method == "DELETE" and session_id:
+            self._unbind(session_id)
+
+        sniff = not session_id and not new_session and \
+            response.headers.get("content-type", "").startswith("text/event-stream")
+
+        async def body():
+            nonlocal sniff
+            bound, seen = None, b""
+            try:
+                async for chunk in response.aiter_raw():
+                    if sniff:
+                        seen += chunk
+                        match = _SSE_SESSION.search(seen)
+                        if match:
+                            bound = match.group(1).decode()
+                            self._bind(bound, worker)
+                        if match or len(seen) > 8192:
+                            sniff = False
+                    yield chunk
+            finally:
+                worker.inflight -= 1
+                await response.aclose()
+                if bound is not None:
+                    self._unbind(bound)  # SSE session ends with its stream
+
+        out_headers = {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS}
+        return StreamingResponse(body(), status_code=response.status_code, headers=out_headers)
+
+    # -- entry point ------------------------------------------------------
+
+    @asynccontextmanager
+    async def _lifespan(self, app):
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0),
+                                         limits=httpx.Limits(max_connections=None, max_keepalive_connections=100))
+        await asyncio.gather(*(self._start_worker() for _ in range(self.worker_count)))
+        monitor = asyncio.create_task(self._monitor())
+        logger.info(f"Router on {self.host}:{self.port} -> {len(self._workers)} workers")
+        try:
+            yield
+        finally:
+            monitor.cancel()
+            await asyncio.gather(*(self._retire(w) for w in list(self._workers)))
+            await self._client.aclose()
+            if self._store is not None:
+                self._store.shutdown()
+
+    def _forward_signal(self, signum, frame):
+        for worker in self._workers:
+            if worker.alive:
+                worker.process.send_signal(signum)
+
+    def run(self):
+        logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per proxied request otherwise
+        if self.shared_state.get("enabled"):
+            address = self.shared_state.get("socket", "/tmp/mcpgateway-state.sock")
+            authkey = secrets.token_bytes(16)
+            self._store = serve_store(address, authkey, int(self.shared_state.get("max_entries", 100000)))
+            self._worker_env = {SOCKET_ENV: address, AUTHKEY_ENV: authkey.hex()}
+
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._forward_signal)  # tool.yml reload in every worker
+
+        methods = ["GET", "POST", "DELETE", "PUT", "PATCH", "OPTIONS", "HEAD"]
+        routes = [Route("/metrics", self.metrics, methods=["GET"]), Route("/{path:path}", self.proxy, methods=methods)]
+        app = Starlette(routes=routes, lifespan=self._lifespan)
+        uvicorn.run(app, host=self.host, port=self.port, log_level="warning")
@@ -0,0 +1,359 @@
+# benchmark.py - Offline latency/throughput benchmark for v1, the v2 tool services and the gateway
+#
+# Starts a fake OpenWeather server plus the services under test on free loopback ports,
+# drives each hop at a fixed concurrency and writes p50/p95/p99 + throughput as JSON.
+#
+#   python benchmark.py --requests 1000 --concurrency 32 --latency-ms 50 --output run.json
+#   python benchmark.py --baseline run.json          # print deltas against an earlier run
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+import yaml
+
+TEST_DIR = Path(__file__).resolve().parent
+V2_DIR = TEST_DIR.parent
+V1_DIR = V2_DIR.parent / "v1"
+
+TARGETS = ("openweather", "weather_tool", "sql_tool", "gateway_weather", "gateway_sql", "v1")
+
+# Which services each target needs running
+REQUIRES = {
+    "openweather": {"fake"},
+    "weather_tool": {"fake", "weather"},
+    "sql_tool": {"sql"},
+    "gateway_weather": {"fake", "weather", "sql", "gateway"},
+    "gateway_sql": {"fake", "weather", "sql", "gateway"},
+    "v1": {"fake", "v1"},
+}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Service:
+    """A server subprocess on a private loopback port; output goes to <workdir>/<name>.log"""
+
+    def __init__(self, name: str, cmd: List[str], cwd: Path, env: Dict[str, str], port: int, workdir: Path):
+        self.name = name
+        self.cmd = cmd
+        self.cwd = cwd
+        self.env = {**os.environ, **env}
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.log_path = workdir / f"{name}.log"
+        self.process: subprocess.Popen | None = None
+
+    def start(self):
+        log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(self.cmd, cwd=self.cwd, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+
+    async def wait_ready(self, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+                writer.close()
+                return
+            except OSError:
+                await asyncio.sleep(0.1)
+        raise RuntimeError(f"{self.name} did not start - see {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+def uvicorn_cmd(port: int) -> List[str]:
+    return [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+
+def gateway_config(workdir: Path, port: int, weather_url: str, sql_url: str):
+    """Write gateway.yml/tool.yml for the gateway under test, pointing tools at the local services"""
+    with open(V2_DIR / "mcpgateway" / "tool.yml") as f:
+        tool_config = yaml.safe_load(f)
+    by_port = {9001: urlsplit(weather_url).netloc, 9002: urlsplit(sql_url).netloc}
+
+    def local(url: str) -> str:
+        parts = urlsplit(url)
+        return urlunsplit(parts._replace(netloc=by_port.get(parts.port, parts.netloc)))
+
+    for tool in tool_config["tools"]:
+        if "endpoints" in tool:
+            tool["endpoints"] = [local(u) for u in tool["endpoints"]]
+        if "endpoint" in tool:
+            tool["endpoint"] = local(tool["endpoint"])
+
+    gateway = {
+        "server": {"host": "127.0.0.1", "port": port, "transport": "streamable-http", "workers": 1},
+        "gateway": {"name": "MCP Gateway (benchmark)", "version": "bench"},
+        "shared_state": {"enabled": False},
+        "reload": {"watch": False},
+    }
+    with open(workdir / "tool.yml", "w") as f:
+        yaml.safe_dump(tool_config, f, sort_keys=False)
+    with open(workdir / "gateway.yml", "w") as f:
+        yaml.safe_dump(gateway, f, sort_keys=False)
+
+def build_services(needed: set, args, workdir: Path) -> Dict[str, Service]:
+    ports = {name: free_port() for name in ("fake", "weather", "sql", "gateway", "v1")}
+    upstream = {
+        "OPENWEATHER_BASE_URL": f"http://127.0.0.1:{ports['fake']}/data/2.5",
+        "OPENWEATHER_API_KEY": "benchmark",
+    }
+    services = {
+        "fake": Service("fake_openweather",
+                        [sys.executable, "fake_openweather.py", "--port", str(ports["fake"])], TEST_DIR,
+                        {"FAKE_LATENCY_MS": str(args.latency_ms), "FAKE_JITTER_MS": str(args.jitter_ms),
+                         "FAKE_ERROR_RATE": str(args.error_rate)}, ports["fake"], workdir),
+        "weather": Service("tool_weathertool", uvicorn_cmd(ports["weather"]), V2_DIR / "tool_weathertool",
+                           {**upstream, "OPENWEATHER_RATE_PER_MINUTE": str(args.quota_per_minute),
+                            "OPENWEATHER_BURST": str(args.quota_burst)}, ports["weather"], workdir),
+        "sql": Service("tool_sqlgenerator", uvicorn_cmd(ports["sql"]), V2_DIR / "tool_sqlgenerator",
+                       {}, ports["sql"], workdir),
+        "gateway": Service("mcpgateway", [sys.executable, str(V2_DIR / "mcpgateway" / "app.py")], workdir,
+                           {}, ports["gateway"], workdir),
+        "v1": Service("v1", uvicorn_cmd(ports["v1"]), V1_DIR,
+                      {**upstream, "LOG_FILE": str(workdir / "v1_mcp_server.log")}, ports["v1"], workdir),
+    }
+    if "gateway" in needed:
+        gateway_config(workdir, ports["gateway"], services["weather"].url, services["sql"].url)
+    return {name: service for name, service in services.items() if name in needed}
+
+# -- load generation -------------------------------------------------------
+
+def percentile(ordered: List[float], pct: float) -> float | None:
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return round(ordered[index] * 1000, 3)
+
+async def run_load(call: Callable[[int], Awaitable[bool]], total: int, concurrency: int,
+                   offset: int = 0) -> Dict[str, Any]:
+    """Issue `total` calls from `concurrency` workers; a call returns False (or raises) on error"""
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                ok = await call(offset + index)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 1) if duration else None,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+    }
+
+def location(index: int, keys: int) -> str:
+    # keys=0: every request is a distinct location, so caches never hit
+    return f"benchcity{index % keys if keys else index}"
+
+def tool_ok(body: Dict[str, Any]) -> bool:
+    return not body.get("isError")
+
+async def bench_target(target: str, services: Dict[str, Service], args, offset: int = 0) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        if target == "openweather":
+            url = f"{services['fake'].url}/data/2.5/weather"
+
+            async def call(i):
+                return (await client.get(url, params={"q": location(i, args.keys)})).status_code == 200
+
+        elif target == "weather_tool":
+            url = f"{services['weather'].url}/v1/get_current_weather"
+
+            async def call(i):
+                response = await client.post(url, json={"tool_name": "get_current_weather", "request_id": i,
+                                                        "arguments": {"location": location(i, args.keys)}})
+                return tool_ok(response.json())
+
+        elif target == "sql_tool":
+            url = f"{services['sql'].url}/v1/generate_sql_files"
+
+            async def call(i):
+                response = await client.post(url, json={"tool_name": "generate_sql_files", "request_id": i,
+                                                        "arguments": sql_arguments(i, args.keys)})
+                return tool_ok(response.json())
+
+        elif target == "v1":
+            url = f"{services['v1'].url}/mcp"
+
+            async def call(i):
+                response = await client.post(url, json={"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {
+                    "name": "get_current_weather", "arguments": {"location": location(i, args.keys)}}})
+                return "result" in response.json()
+
+        else:
+            return await bench_gateway(target, services["gateway"], args, offset)
+
+        return await run_load(call, args.requests, args.concurrency, offset)
+
+def sql_arguments(index: int, keys: int) -> Dict[str, Any]:
+    n = index % keys if keys else index
+    return {"streamid": f"bench_{n:06d}", "sql_content": f"SELECT * FROM events WHERE id = {n};\nDELETE FROM staging;"}
+
+async def bench_gateway(target: str, gateway: Service, args, offset: int = 0) -> Dict[str, Any]:
+    """Drive the gateway through real MCP sessions (one per concurrent client)"""
+    from fastmcp import Client
+
+    url = f"{gateway.url}/mcp"
+    clients = [Client(url, timeout=args.timeout) for _ in range(args.concurrency)]
+    for client in clients:
+        await client.__aenter__()
+    try:
+        free = asyncio.Queue()
+        for client in clients:
+            free.put_nowait(client)
+
+        async def call(i):
+            client = await free.get()
+            try:
+                if target == "gateway_weather":
+                    result = await client.call_tool("get_current_weather", {"location": location(i, args.keys)},
+                                                    raise_on_error=False)
+                else:
+                    result = await client.call_tool("generate_sql_files", sql_arguments(i, args.keys),
+                                                    raise_on_error=False)
+                return not result.is_error
+            finally:
+                free.put_nowait(client)
+
+        return await run_load(call, args.requests, args.concurrency, offset)
+    finally:
+        for client in clients:
+            await client.__aexit__(None, None, None)
+
+# -- reporting ---------------------------------------------------------------
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=V2_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(results: Dict[str, Any], baseline: Dict[str, Any] | None):
+    columns = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors")
+    print(f"\n{'hop':<16}" + "".join(f"{c:>16}" for c in columns))
+    for target, stats in results.items():
+        row = f"{target:<16}"
+        before = (baseline or {}).get(target) or {}
+        for column in columns:
+            value = stats.get(column)
+            cell = "-" if value is None else f"{value:g}"
+            if isinstance(value, (int, float)) and before.get(column):
+                cell += f" ({(value - before[column]) / before[column] * 100:+.0f}%)"
+            row += f"{cell:>16}"
+        print(row)
+
+async def main_async(args) -> Dict[str, Any]:
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        raise SystemExit(f"Unknown targets: {', '.join(sorted(unknown))} (expected {', '.join(TARGETS)})")
+
+    needed = set().union(*(REQUIRES[t] for t in targets))
+    with tempfile.TemporaryDirectory(prefix="mcp-bench-") as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        services = build_services(needed, args, workdir)
+        try:
+            for service in services.values():
+                service.start()
+            await asyncio.gather(*(s.wait_ready() for s in services.values()))
+
+            results = {}
+            for target in targets:
+                if args.warmup:
+                    # Warmup keys sit after the measured range so they don't pre-fill caches
+                    warm = argparse.Namespace(**{**vars(args), "requests": args.warmup})
+                    await bench_target(target, services, warm, offset=args.requests)
+                print(f"Running {target}: {args.requests} requests at concurrency {args.concurrency}...")
+                results[target] = await bench_target(target, services, args)
+            return results
+        finally:
+            for service in services.values():
+                service.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline MCP benchmark (no OpenWeather access needed)")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"comma-separated subset of: {', '.join(TARGETS)}")
+    parser.add_argument("--requests", type=int, default=500, help="requests per target")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each target")
+    parser.add_argument("--keys", type=int, default=0, help="distinct locations/stream ids (0 = all distinct, no cache hits)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake OpenWeather latency")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake OpenWeather 503 probability")
+    parser.add_argument("--quota-per-minute", type=float, default=1e9, help="weather tool's OpenWeather quota (default: unlimited)")
+    parser.add_argument("--quota-burst", type=float, default=1e6)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--workdir", help="keep generated configs and service logs here")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "workdir")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(results, baseline)
+    print(f"\nSaved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
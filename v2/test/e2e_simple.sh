@@ -39,6 +39,21 @@ curl -s -X POST http://localhost:9002/v1/generate_sql_files \
     "request_id": 1
   }' | jq .
 
+# Test 6: Bulk SQL generation (identical SQL bodies are generated once)
+echo -e "\n6. Testing SQL bundle generation directly..."
+curl -s -X POST http://localhost:9002/v1/generate_sql_bundle \
+  -H "Content-Type: application/json" \
+  -d '{
+    "tool_name": "generate_sql_bundle",
+    "arguments": {
+      "streams": [
+        {"streamid": "test_001", "sql_content": "SELECT * FROM users;"},
+        {"streamid": "test_002", "sql_content": "SELECT * FROM users;"}
+      ]
+    },
+    "request_id": 1
+  }' | jq '.content'
+
 echo -e "\n✅ Tests completed!"
 echo "💡 Note: This tests direct tool calls. FastMCP uses SSE transport."
 echo "💡 Use Claude Desktop or MCP client to test full FastMCP integration."
\ No newline at end of file
@@ -0,0 +1,59 @@
+# fake_openweather.py - Local OpenWeather stand-in for offline benchmarks
+import os
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+# Behaviour is read from the environment so benchmark.py can configure a subprocess
+LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("FAKE_JITTER_MS", "10"))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+
+app = FastAPI()
+
+def current_payload(city: str) -> dict:
+    return {
+        "name": city,
+        "main": {"temp": round(random.uniform(-5, 35), 1), "humidity": random.randint(20, 90)},
+        "weather": [{"description": random.choice(["clear sky", "few clouds", "light rain", "overcast clouds"])}],
+    }
+
+def forecast_payload(city: str) -> dict:
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    items = []
+    for i in range(40):  # 5 days of 3-hour intervals, like the real API
+        items.append({
+            "dt_txt": (start + timedelta(hours=3 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "main": {"temp": round(random.uniform(-5, 35), 1)},
+            "weather": [{"description": "scattered clouds"}],
+        })
+    return {"city": {"name": city}, "list": items}
+
+async def simulate(q: str, lat: float | None, lon: float | None, build):
+    delay = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < ERROR_RATE:
+        return JSONResponse({"cod": 503, "message": "simulated upstream error"}, status_code=503)
+    return build(q.split(",")[0].title() if q else f"{lat},{lon}")
+
+@app.get("/data/2.5/weather")
+async def weather(q: str = "", lat: float | None = None, lon: float | None = None, units: str = "metric", appid: str = ""):
+    return await simulate(q, lat, lon, current_payload)
+
+@app.get("/data/2.5/forecast")
+async def forecast(q: str = "", lat: float | None = None, lon: float | None = None, units: str = "metric", appid: str = ""):
+    return await simulate(q, lat, lon, forecast_payload)
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "latency_ms": LATENCY_MS, "error_rate": ERROR_RATE}
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Fake OpenWeather server")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
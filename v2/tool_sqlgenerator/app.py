@@ -1,27 +1,57 @@
 # app.py - SQL Generator Tool (Script Generation Version)
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Dict, Any, Union
+import os
+import io
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import tarfile
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List
 import base64
 
-app = FastAPI()
+# Shared v2 modules live in ../common in the source tree; the image copies them into /app/common
+_V2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.isdir(os.path.join(_V2_DIR, "common")) and _V2_DIR not in sys.path:
+    sys.path.append(_V2_DIR)
 
-class ToolRequest(BaseModel):
-    tool_name: str
-    arguments: Dict[str, Any]
-    request_id: Union[int, str]
+from common.metrics import REGISTRY, CONTENT_TYPE
+from common.batch import ToolRequest, make_batch_route
+from common.tool_metrics import instrument
+from common.wire import WireResponse, WireMiddleware
+from sql_check import SqlChecker, NORMALIZE_MODES, format_issues
 
-@app.post("/v1/generate_sql_files")
-async def generate_sql_files(request: ToolRequest):
+# SQL validation/normalization: big scripts are parsed in worker processes, results memoized by content hash
+_sql_checker = SqlChecker(
+    workers=int(os.getenv("SQL_CHECK_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    inline_bytes=int(os.getenv("SQL_CHECK_INLINE_BYTES", "65536")),
+    max_entries=int(os.getenv("SQL_CHECK_CACHE_SIZE", "256")),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     try:
-        streamid = request.arguments.get("streamid")
-        sql_content = request.arguments.get("sql_content")
-        
-        if not streamid or not sql_content:
-            return {"content": [{"type": "text", "text": "Missing streamid or sql_content"}], "isError": True}
-        
-        # Generate .jil file content
-        jil_content = f"""-- Stream ID: {streamid}
+        yield
+    finally:
+        _sql_checker.close()
+
+# Responses are MessagePack/JSON and compressed as each client negotiates
+app = FastAPI(lifespan=lifespan, default_response_class=WireResponse)
+app.add_middleware(WireMiddleware)
+
+# Output modes: "full" returns text + script + files (each embeds the SQL); "script"/"files" return only that part
+OUTPUT_MODES = ("full", "script", "files")
+# Stream ids become shell arguments, file names and tar member paths: no quoting, separators, options or ".."
+STREAMID_PATTERN = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.-]*")
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "65536"))
+
+def render_jil(streamid: str) -> str:
+    return f"""-- Stream ID: {streamid}
 -- Generated JIL file
 -- This file contains metadata for stream: {streamid}
 
@@ -29,16 +59,16 @@ STREAM_ID={streamid}
 GENERATED_AT=${{timestamp}}
 FILE_TYPE=JIL
 """
-        
-        # Generate main.sql content (use the provided SQL)
-        main_sql_content = f"""-- Main SQL file for stream: {streamid}
+
+def main_sql_parts(streamid: str, sql_content: str) -> List[str]:
+    """main.sql as pieces; the SQL itself is referenced, not copied"""
+    return [f"""-- Main SQL file for stream: {streamid}
 -- Generated automatically
 
-{sql_content}
-"""
-        
-        # Create executable script
-        script_content = f"""#!/bin/bash
+""", sql_content, "\n"]
+
+def script_parts(streamid: str, jil_content: str, sql_parts: List[str]) -> List[str]:
+    return [f"""#!/bin/bash
 # Auto-generated script to create SQL files for stream: {streamid}
 
 echo "Creating directories..."
@@ -52,7 +82,7 @@ JIL_EOF
 
 echo "Creating SQL file..."
 cat > ./sql/main.sql << 'SQL_EOF'
-{main_sql_content}
+""", *sql_parts, f"""
 SQL_EOF
 
 echo "✅ Files created successfully:"
@@ -62,9 +92,102 @@ echo ""
 echo "File contents:"
 echo "📄 JIL file size: $(wc -c < ./jil/{streamid}.jil) bytes"
 echo "📄 SQL file size: $(wc -c < ./sql/main.sql) bytes"
+"""]
+
+def script_info(streamid: str) -> Dict[str, str]:
+    return {
+        "filename": f"create_sql_files_{streamid}.sh",
+        "instructions": "Save this script and run: chmod +x create_sql_files_{streamid}.sh && ./create_sql_files_{streamid}.sh"
+    }
+
+def summary_text(streamid: str, jil_size: int, sql_size: int, output: str) -> str:
+    """Short result text for the script/files/stream modes (no embedded SQL)"""
+    where = {"script": "executable_script", "files": "files"}.get(output, "executable_script and files")
+    return f"""📁 Generated SQL files for stream: {streamid}
+
+Artifacts are returned in {where}.
+JIL File: ./jil/{streamid}.jil ({jil_size} chars)
+SQL File: ./sql/main.sql ({sql_size} chars)
 """
+
+def check_streamid(streamid: Any, label: str = "streamid"):
+    if not isinstance(streamid, str) or not STREAMID_PATTERN.fullmatch(streamid) or ".." in streamid:
+        raise ValueError(f"{label} must be letters, digits, '_', '.' or '-' (not starting with '.' or '-', no '..'), "
+                         f"got {str(streamid)[:64]!r}")
+
+def parse_arguments(arguments: Dict[str, Any]):
+    streamid = arguments.get("streamid")
+    sql_content = arguments.get("sql_content")
+    output = arguments.get("output", "full")
+    if not streamid or not sql_content:
+        raise ValueError("Missing streamid or sql_content")
+    check_streamid(streamid)
+    if output not in OUTPUT_MODES:
+        raise ValueError(f"output must be one of: {', '.join(OUTPUT_MODES)}")
+    return streamid, sql_content, output
+
+def parse_check_options(arguments: Dict[str, Any]):
+    validate = arguments.get("validate", False)
+    normalize = arguments.get("normalize", "none")
+    if not isinstance(validate, bool):
+        raise ValueError("validate must be true or false")
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"normalize must be one of: {', '.join(NORMALIZE_MODES)}")
+    return validate, normalize
+
+async def prepare_sql(sql_content: str, validate: bool, normalize: str):
+    """(SQL to embed, check report or None); normalized SQL replaces the input only when it parsed cleanly and round-tripped"""
+    if not validate and normalize == "none":
+        return sql_content, None
+    report = await _sql_checker.check(sql_content, normalize)
+    return report["sql"] or sql_content, report
+
+def validation_summary(report: Dict[str, Any] | None, normalize: str) -> Dict[str, Any]:
+    if report is None:
+        return {}
+    return {"validation": {"ok": report["ok"], "statements": report["statements"], "errors": report["errors"],
+                           "warnings": report["warnings"], "normalized": normalize if report["sql"] else "none"}}
+
+def validation_error(report: Dict[str, Any], label: str) -> Dict[str, Any]:
+    text = f"SQL validation failed for {label}:\n{format_issues(report['errors'])}"
+    return {"content": [{"type": "text", "text": text}], "isError": True, **validation_summary(report, "none")}
+
+def warnings_text(report: Dict[str, Any] | None) -> str:
+    if not report or not report["warnings"]:
+        return ""
+    return f"\n⚠️ SQL warnings:\n{format_issues(report['warnings'])}\n"
+
+@app.post("/v1/generate_sql_files")
+@instrument("generate_sql_files")
+async def generate_sql_files(request: ToolRequest):
+    try:
+        try:
+            streamid, sql_content, output = parse_arguments(request.arguments)
+            validate, normalize = parse_check_options(request.arguments)
+        except ValueError as e:
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+        
+        sql_content, report = await prepare_sql(sql_content, validate, normalize)
+        if validate and not report["ok"]:
+            return validation_error(report, f"stream {streamid}")
+        
+        # Each artifact is built once; only the requested ones are joined into strings
+        jil_content = render_jil(streamid)
+        sql_parts = main_sql_parts(streamid, sql_content)
+        sql_size = sum(len(part) for part in sql_parts)
+        result = {"isError": False, **validation_summary(report, normalize)}
         
-        result_text = f"""📁 Generated SQL files for stream: {streamid}
+        if output in ("full", "script"):
+            script_content = "".join(script_parts(streamid, jil_content, sql_parts))
+            result["executable_script"] = {**script_info(streamid), "content": script_content}
+        if output in ("full", "files"):
+            result["files"] = {
+                f"jil/{streamid}.jil": jil_content,
+                "sql/main.sql": "".join(sql_parts)
+            }
+        
+        if output == "full":
+            result_text = f"""📁 Generated SQL files for stream: {streamid}
 
 🤖 GITHUB COPILOT: Please create and execute the following script:
 
@@ -79,29 +202,215 @@ MANUAL_STEPS (if script doesn't work):
 
 📄 PREVIEW:
 JIL File: ./jil/{streamid}.jil ({len(jil_content)} chars)
-SQL File: ./sql/main.sql ({len(main_sql_content)} chars)
+SQL File: ./sql/main.sql ({sql_size} chars)
 """
+        else:
+            result_text = summary_text(streamid, len(jil_content), sql_size, output)
+        result_text += warnings_text(report)
+        
+        return {"content": [{"type": "text", "text": result_text}], **result}
         
+    except Exception as e:
+        return {"content": [{"type": "text", "text": f"Error: {str(e)}"}], "isError": True}
+
+def _chunks(parts: List[str], size: int):
+    for part in parts:
+        for offset in range(0, len(part), size):
+            yield part[offset:offset + size]
+
+def iter_ndjson(streamid: str, sql_content: str, output: str, validation: Dict[str, Any] | None = None):
+    """One JSON object per line; large artifacts arrive as bounded-size chunks"""
+    def line(obj: Dict[str, Any]) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode()
+    
+    jil_content = render_jil(streamid)
+    sql_parts = main_sql_parts(streamid, sql_content)
+    sql_size = sum(len(part) for part in sql_parts)
+    yield line({"type": "meta", "streamid": streamid, "output": output, **(validation or {})})
+    
+    if output in ("full", "files"):
+        for path, parts in ((f"jil/{streamid}.jil", [jil_content]), ("sql/main.sql", sql_parts)):
+            for chunk in _chunks(parts, STREAM_CHUNK_SIZE):
+                yield line({"type": "file", "path": path, "data": chunk})
+            yield line({"type": "file_end", "path": path, "size": sum(len(part) for part in parts)})
+    if output in ("full", "script"):
+        info = script_info(streamid)
+        for chunk in _chunks(script_parts(streamid, jil_content, sql_parts), STREAM_CHUNK_SIZE):
+            yield line({"type": "script", "filename": info["filename"], "data": chunk})
+        yield line({"type": "script_end", **info})
+    
+    yield line({"type": "done", "isError": False,
+                "content": [{"type": "text", "text": summary_text(streamid, len(jil_content), sql_size, output)}]})
+
+@app.post("/v1/generate_sql_files/stream")
+@instrument("generate_sql_files_stream")
+async def generate_sql_files_stream(request: ToolRequest):
+    """NDJSON variant for large SQL: memory and response size stay proportional to the input"""
+    try:
+        streamid, sql_content, output = parse_arguments(request.arguments)
+        validate, normalize = parse_check_options(request.arguments)
+    except ValueError as e:
+        return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+    sql_content, report = await prepare_sql(sql_content, validate, normalize)
+    if validate and not report["ok"]:
+        return validation_error(report, f"stream {streamid}")
+    return StreamingResponse(iter_ndjson(streamid, sql_content, output, validation_summary(report, normalize)),
+                             media_type="application/x-ndjson")
+
+# Bulk generation: many streams per call, identical SQL bodies rendered and shipped once
+BUNDLE_FORMATS = ("script", "archive")
+BUNDLE_MAX_STREAMS = int(os.getenv("BUNDLE_MAX_STREAMS", "2000"))
+BUNDLE_WORKERS = int(os.getenv("BUNDLE_WORKERS", str(min(8, os.cpu_count() or 1))))
+BUNDLE_CHUNK = 64  # streams per worker task
+# Hashing and gzip release the GIL, so threads parallelize the heavy parts without copying the SQL to other processes
+_bundle_pool = ThreadPoolExecutor(max_workers=BUNDLE_WORKERS, thread_name_prefix="bundle")
+
+def parse_streams(arguments: Dict[str, Any]):
+    streams = arguments.get("streams")
+    bundle_format = arguments.get("format", "script")
+    if not isinstance(streams, list) or not streams:
+        raise ValueError("streams must be a non-empty list of {streamid, sql_content}")
+    if len(streams) > BUNDLE_MAX_STREAMS:
+        raise ValueError(f"Too many streams ({len(streams)} > {BUNDLE_MAX_STREAMS})")
+    if bundle_format not in BUNDLE_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(BUNDLE_FORMATS)}")
+    seen = set()
+    for i, item in enumerate(streams):
+        if not isinstance(item, dict) or not item.get("streamid") or not item.get("sql_content"):
+            raise ValueError(f"streams[{i}]: missing streamid or sql_content")
+        check_streamid(item["streamid"], f"streams[{i}].streamid")
+        if item["streamid"] in seen:
+            raise ValueError(f"streams[{i}]: duplicate streamid {item['streamid']}")
+        seen.add(item["streamid"])
+    return streams, bundle_format
+
+def _hash_streams(streams: List[Dict[str, Any]]) -> List[str]:
+    return [hashlib.sha256(item["sql_content"].encode()).hexdigest() for item in streams]
+
+async def group_by_content(streams: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """content hash -> {"sql_content", "streamids"}, in first-seen order; hashing runs on the worker pool"""
+    loop = asyncio.get_running_loop()
+    chunks = [streams[i:i + BUNDLE_CHUNK] for i in range(0, len(streams), BUNDLE_CHUNK)]
+    hashed = await asyncio.gather(*(loop.run_in_executor(_bundle_pool, _hash_streams, chunk) for chunk in chunks))
+    groups: Dict[str, Dict[str, Any]] = {}
+    for chunk, digests in zip(chunks, hashed):
+        for item, digest in zip(chunk, digests):
+            group = groups.setdefault(digest, {"sql_content": item["sql_content"], "streamids": []})
+            group["streamids"].append(item["streamid"])
+    return groups
+
+def _group_main_sql(group: Dict[str, Any]) -> str:
+    # One main.sql per unique body, naming every stream that shares it
+    return "".join(main_sql_parts(", ".join(group["streamids"]), group["sql_content"]))
+
+def render_bundle_script(groups: Dict[str, Dict[str, Any]]) -> str:
+    """Each unique SQL body is embedded once; streams sharing it get a copy on disk via cp"""
+    parts = ["#!/bin/bash\n# Auto-generated script to create SQL files for multiple streams\nset -e\n"]
+    for digest, group in groups.items():
+        first, *rest = group["streamids"]
+        marker = digest[:12]
+        for streamid in group["streamids"]:
+            parts.append(f"""
+mkdir -p "{streamid}/jil" "{streamid}/sql"
+cat > "./{streamid}/jil/{streamid}.jil" << 'JIL_EOF_{marker}'
+{render_jil(streamid)}JIL_EOF_{marker}
+""")
+        parts += [f"cat > \"./{first}/sql/main.sql\" << 'SQL_EOF_{marker}'\n", _group_main_sql(group), f"SQL_EOF_{marker}\n"]
+        parts += [f"cp \"./{first}/sql/main.sql\" \"./{streamid}/sql/main.sql\"\n" for streamid in rest]
+    streams = sum(len(group["streamids"]) for group in groups.values())
+    parts.append(f"""
+echo "✅ Created files for {streams} streams ({len(groups)} unique SQL bodies)"
+""")
+    return "".join(parts)
+
+def render_bundle_archive(groups: Dict[str, Dict[str, Any]]) -> str:
+    """Base64 tar.gz; streams sharing a SQL body get hard links to a single stored main.sql"""
+    buffer = io.BytesIO()
+    mtime = time.time()
+
+    def add_file(tar: tarfile.TarFile, path: str, text: str):
+        data = text.encode()
+        info = tarfile.TarInfo(path)
+        info.size, info.mtime, info.mode = len(data), mtime, 0o644
+        tar.addfile(info, io.BytesIO(data))
+
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for group in groups.values():
+            first, *rest = group["streamids"]
+            first_sql = f"{first}/sql/main.sql"
+            add_file(tar, first_sql, _group_main_sql(group))
+            for streamid in rest:
+                link = tarfile.TarInfo(f"{streamid}/sql/main.sql")
+                link.type, link.linkname, link.mtime, link.mode = tarfile.LNKTYPE, first_sql, mtime, 0o644
+                tar.addfile(link)
+            for streamid in group["streamids"]:
+                add_file(tar, f"{streamid}/jil/{streamid}.jil", render_jil(streamid))
+    return base64.b64encode(buffer.getvalue()).decode()
+
+@app.post("/v1/generate_sql_bundle")
+@instrument("generate_sql_bundle")
+async def generate_sql_bundle(request: ToolRequest):
+    try:
+        try:
+            streams, bundle_format = parse_streams(request.arguments)
+            validate, normalize = parse_check_options(request.arguments)
+        except ValueError as e:
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+        
+        groups = await group_by_content(streams)
+        if validate or normalize != "none":
+            # Each unique body is checked once; normalizing can merge bodies that differed only in layout
+            prepared = await asyncio.gather(*(prepare_sql(g["sql_content"], validate, normalize) for g in groups.values()))
+            failed = [(g["streamids"], report) for g, (_, report) in zip(groups.values(), prepared)
+                      if validate and not report["ok"]]
+            if failed:
+                text = "SQL validation failed:\n" + "\n".join(
+                    f"streams {', '.join(ids)}:\n{format_issues(report['errors'])}" for ids, report in failed)
+                return {"content": [{"type": "text", "text": text}], "isError": True}
+            if normalize != "none":
+                streams = [{"streamid": streamid, "sql_content": sql}
+                           for g, (sql, _) in zip(groups.values(), prepared) for streamid in g["streamids"]]
+                groups = await group_by_content(streams)
+        loop = asyncio.get_running_loop()
+        summary = f"""📦 Generated SQL files for {len(streams)} streams ({len(groups)} unique SQL bodies)
+
+Each stream gets ./<streamid>/jil/<streamid>.jil and ./<streamid>/sql/main.sql.
+"""
+        if bundle_format == "archive":
+            content = await loop.run_in_executor(_bundle_pool, render_bundle_archive, groups)
+            return {
+                "content": [{"type": "text", "text": summary + "Decode the archive and run: base64 -d sql_bundle.tar.gz.b64 | tar -xz"}],
+                "isError": False,
+                "archive": {"filename": "sql_bundle.tar.gz", "encoding": "base64", "content": content}
+            }
+        
+        content = await loop.run_in_executor(_bundle_pool, render_bundle_script, groups)
         return {
-            "content": [{"type": "text", "text": result_text}], 
+            "content": [{"type": "text", "text": summary + "Artifacts are returned in executable_script."}],
             "isError": False,
             "executable_script": {
-                "filename": f"create_sql_files_{streamid}.sh",
-                "content": script_content,
-                "instructions": "Save this script and run: chmod +x create_sql_files_{streamid}.sh && ./create_sql_files_{streamid}.sh"
-            },
-            "files": {
-                f"jil/{streamid}.jil": jil_content,
-                "sql/main.sql": main_sql_content
+                "filename": "create_sql_bundle.sh",
+                "content": content,
+                "instructions": "Save this script and run: chmod +x create_sql_bundle.sh && ./create_sql_bundle.sh"
             }
         }
         
     except Exception as e:
         return {"content": [{"type": "text", "text": f"Error: {str(e)}"}], "isError": True}
 
+# /v1/batch items are dispatched by tool name
+make_batch_route(app, {
+    "generate_sql_files": generate_sql_files,
+    "generate_sql_bundle": generate_sql_bundle,
+})
+
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "sql_check": _sql_checker.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -4,6 +4,6 @@ set -euo pipefail
 docker-compose down --rmi local -v
 docker ps -a --filter ancestor=sqlgen-tool:latest -q | xargs -r docker rm -f
 docker rmi -f sqlgen-tool:latest || true
-docker build -t sqlgen-tool:latest .
+docker build --build-context common=../common -t sqlgen-tool:latest .  # common/: modules shared by the v2 services
 docker-compose up -d
 echo "✅ SQL Generator Tool running at: http://localhost:9002"
\ No newline at end of file
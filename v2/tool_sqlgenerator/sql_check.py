@@ -0,0 +1,379 @@
+# sql_check.py - SQL tokenizer, validation and normalization, run off the event loop with an LRU memo
+import re
+import bisect
+import asyncio
+import hashlib
+import logging
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+NORMALIZE_MODES = ("none", "canonical", "format")
+MAX_ISSUES = 20
+
+# Dialect-neutral lexer: strings ('' escapes, N'/X'/B' prefixes, E'..' and Oracle q'[..]' quoting), $tag$ quoting,
+# "quoted"/`quoted` names, :name/@var/$1/?/#temp parameters and names, and the usual operators. Tried in order at
+# each position. `# ` (hash then whitespace) is a MySQL line comment; `\cmd` at the start of a line is a psql
+# meta-command. With backslash escapes (MySQL/Hive), \' inside '...' does not end the string. GO (T-SQL) or /
+# (SQL*Plus) alone on a line is a batch separator: it ends the statement and keeps its own line.
+_LEXER = r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|\#(?=\s|$)[^\n]*|/\*.*?\*/)
+  | (?P<open_comment>/\*)
+  | (?P<meta>\\[A-Za-z!?][^\n]*)
+  | (?P<string>[Nn]?[Qq]'(?:\[.*?\]|\{.*?\}|\(.*?\)|<.*?>|(?P<qtag>[^\s'\[{(<]).*?(?P=qtag))'
+               |[Ee]'(?:[^'\\]|\\.|'')*'
+               |[NnXxBb]?'STRING_BODY'
+               |\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$)
+  | (?P<open_string>(?:[Nn]?[Qq]|[NnEeXxBb])?'|\$(?:[A-Za-z_]\w*)?\$)
+  | (?P<qident>"(?:[^"]|"")*"|`(?:[^`]|``)*`)
+  | (?P<open_qident>["`])
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[^\W\d][\w$#@]*)
+  | (?P<op><>|!=|<=|>=|\|\||::|:=|=>|->>|->|[-+*/%=<>~^&|!])
+  | (?P<param>[:@$?#]\w*)
+  | (?P<punct>[(),;.\[\]{}])
+"""
+_TOKEN = re.compile(_LEXER.replace("STRING_BODY", "(?:[^']|'')*"), re.S | re.X)
+_TOKEN_BACKSLASH = re.compile(_LEXER.replace("STRING_BODY", "(?:[^'\\\\]|\\\\.|'')*"), re.S | re.X)
+# Opening delimiters that only match when the closing one is missing
+_UNTERMINATED = {
+    "open_comment": "unterminated block comment",
+    "open_string": "unterminated string literal",
+    "open_qident": "unterminated quoted identifier",
+}
+# Tokens that run to the end of their line
+_LINE_TOKENS = ("--", "#", "\\")
+# Client batch separators, recognized only alone on a line
+_SEPARATORS = frozenset({"GO", "/"})
+
+STATEMENT_KEYWORDS = frozenset("""
+    ALTER ANALYZE BEGIN CALL COMMENT COMMIT COPY CREATE DECLARE DELETE DESCRIBE DROP ELSE END EXEC EXECUTE
+    EXPLAIN GRANT IF INSERT LOOP MERGE REPLACE REVOKE ROLLBACK SAVEPOINT SELECT SET SHOW START TRUNCATE
+    UPDATE UPSERT USE VACUUM VALUES WITH
+""".split())
+
+KEYWORDS = STATEMENT_KEYWORDS | frozenset("""
+    ALL AND ANY AS ASC BETWEEN BY CASCADE CASE CAST CHECK COLUMN CONSTRAINT CROSS CURRENT_DATE
+    CURRENT_TIMESTAMP DATABASE DEFAULT DESC DISTINCT EXCEPT EXISTS FALSE FETCH FIRST FOR FOREIGN FROM FULL
+    FUNCTION GROUP HAVING ILIKE IN INDEX INNER INTERSECT INTERVAL INTO IS JOIN KEY LATERAL LEFT LIKE LIMIT
+    NATURAL NOT NULL NULLS OFFSET ON OR ORDER OUTER OVER PARTITION PRIMARY PROCEDURE REFERENCES RETURNING
+    RIGHT ROW ROWS SCHEMA TABLE TEMP TEMPORARY THEN TO TOP TRIGGER TRUE UNION UNIQUE USING VIEW WHEN WHERE
+    WINDOW
+""".split())
+
+# A comma directly before one of these is a syntax error in every dialect
+_NO_COMMA_BEFORE = frozenset({"FROM", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION", "INTO"})
+# format mode starts a new line before these
+_CLAUSES = frozenset({"SELECT", "FROM", "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "UNION",
+                      "INTERSECT", "EXCEPT", "VALUES", "SET", "RETURNING", "WINDOW", "JOIN"})
+_JOIN_PREFIXES = frozenset({"LEFT", "RIGHT", "INNER", "FULL", "CROSS", "NATURAL", "OUTER"})
+
+def _lex(sql: str, pattern: re.Pattern) -> Tuple[List[Tuple[str, str, int]], List[Tuple[int, str]]]:
+    tokens, errors = [], []
+    pos = 0
+    for match in pattern.finditer(sql):
+        start = match.start()
+        if start != pos:  # characters no token can start with were skipped
+            errors += [(offset, f"unexpected character {sql[offset]!r}") for offset in range(pos, min(start, pos + MAX_ISSUES))]
+            if len(errors) >= MAX_ISSUES:
+                return tokens, errors[:MAX_ISSUES]
+        kind = match.lastgroup
+        if kind in _UNTERMINATED:
+            errors.append((start, _UNTERMINATED[kind]))
+            return tokens, errors[:MAX_ISSUES]
+        if kind == "meta" and sql[sql.rfind("\n", 0, start) + 1:start].strip():
+            errors.append((start, "unexpected character '\\\\'"))  # meta-commands start a line
+            return tokens, errors[:MAX_ISSUES]
+        text = match.group()
+        if kind in ("word", "op") and text.upper() in _SEPARATORS and _alone_on_line(sql, start, match.end()):
+            kind = "separator"
+        tokens.append((kind, text, start))
+        pos = match.end()
+    errors += [(offset, f"unexpected character {sql[offset]!r}") for offset in range(pos, min(len(sql), pos + MAX_ISSUES))]
+    return tokens, errors[:MAX_ISSUES]
+
+def _alone_on_line(sql: str, start: int, end: int) -> bool:
+    line_end = sql.find("\n", end)
+    return not sql[sql.rfind("\n", 0, start) + 1:start].strip() and not sql[end:None if line_end < 0 else line_end].strip()
+
+def tokenize(sql: str, backslash_escapes: bool | None = None) -> Tuple[List[Tuple[str, str, int]], List[Tuple[int, str]]]:
+    """(kind, text, offset) tokens and (offset, message) lexical errors; stops at an unterminated token.
+
+    By default strings are lexed the standard way first and with backslash escapes only if that
+    leaves one unterminated, so both 'C:\\' (standard) and 'it\\'s' (MySQL/Hive) are accepted.
+    """
+    return _tokenize(sql, backslash_escapes)[:2]
+
+def _tokenize(sql: str, backslash_escapes: bool | None):
+    if backslash_escapes is None:
+        tokens, errors = _lex(sql, _TOKEN)
+        if not any(message == _UNTERMINATED["open_string"] for _, message in errors):
+            return tokens, errors, False
+        escaped = _lex(sql, _TOKEN_BACKSLASH)
+        if not escaped[1]:
+            return escaped[0], escaped[1], True
+        return tokens, errors, False
+    return (*_lex(sql, _TOKEN_BACKSLASH if backslash_escapes else _TOKEN), backslash_escapes)
+
+def _significant(tokens):
+    return [t for t in tokens if t[0] not in ("ws", "comment", "meta")]
+
+def _word(token) -> str:
+    return token[1].upper() if token[0] == "word" else ""
+
+def validate(tokens) -> Tuple[List[Tuple[int, str]], List[Tuple[int, str]], int]:
+    """Structural checks: balanced parentheses, dangling commas, plausible statement starts"""
+    errors, warnings = [], []
+    open_parens: List[int] = []
+    statements = 0
+    start_of_statement = True
+    prev = None
+    for token in _significant(tokens):
+        kind, text, offset = token
+        ends_statement = text == ";" or kind == "separator"
+        if start_of_statement and not ends_statement:
+            statements += 1
+            if kind == "word" and text.upper() not in STATEMENT_KEYWORDS:
+                warnings.append((offset, f"statement starts with '{text}'"))
+            elif kind not in ("word", "punct"):
+                warnings.append((offset, f"statement starts with {kind} '{text[:20]}'"))
+            start_of_statement = False
+        if prev is not None and prev[1] == "," and (text == ")" or ends_statement or _word(token) in _NO_COMMA_BEFORE):
+            errors.append((prev[2], f"trailing comma before '{text}'"))
+        if text == "(":
+            open_parens.append(offset)
+        elif text == ")":
+            if open_parens:
+                open_parens.pop()
+            else:
+                errors.append((offset, "unmatched ')'"))
+        elif ends_statement:
+            # Statements never end inside parentheses: whatever is still open was never closed
+            errors += [(paren, "unclosed '('") for paren in open_parens]
+            open_parens.clear()
+            start_of_statement = True
+        prev = token
+    if prev is not None and prev[1] == ",":
+        errors.append((prev[2], "trailing comma at end of input"))
+    errors += [(offset, "unclosed '('") for offset in open_parens]
+    return errors, warnings, statements
+
+def render(tokens, pretty: bool) -> str:
+    """Canonical SQL (keywords upper-cased, whitespace collapsed, one statement per line) or formatted SQL.
+
+    Only whitespace and keyword case change: tokens that touch in the input are never split apart,
+    comments and hints are kept, and a line comment always ends its output line. A GO or / batch
+    separator ends the statement on a line of its own, without a ';' before it.
+    """
+    out: List[str] = []
+    depth = 0
+    braces = 0  # inside {...}: template code ({{ ref('x') }}, {% if %}) keeps its case and layout
+    prev = None  # previous token on the current line, comments included
+    in_statement = False  # a non-comment token since the last ';'
+    newline = True
+    spaced = False  # the input had whitespace between the previous token and this one
+    for kind, text, _ in tokens:
+        if kind == "ws":
+            spaced = True
+            continue
+        if kind in ("comment", "meta") and text.startswith(_LINE_TOKENS):
+            if not newline:
+                out.append("\n" if kind == "meta" else " " if spaced else "")
+            out.append(text.rstrip() + "\n" + "    " * depth)
+            prev, newline, spaced = None, True, False
+            continue
+        upper = text.upper() if kind == "word" else ""
+        if upper in KEYWORDS and not braces:
+            text = upper
+        if text == ";":
+            if in_statement:  # empty statements are dropped
+                out.append(";\n")
+            prev, in_statement, newline, spaced, depth = None, False, True, False, 0
+            continue
+        if kind == "separator":
+            out.append(("" if newline else "\n") + text + "\n")
+            prev, in_statement, newline, spaced, depth = None, False, True, False, 0
+            continue
+        if text == ")":
+            depth = max(0, depth - 1)
+
+        if pretty and spaced and not newline and not braces and (upper in _CLAUSES or upper in _JOIN_PREFIXES) \
+                and not (prev is not None and _word(prev) in _JOIN_PREFIXES):
+            out.append("\n" + "    " * depth)
+            newline = True
+
+        if spaced and not newline and prev is not None:
+            glue = (text in (")", ",", ".") or prev[1] in ("(", ".", "::") or text == "::"
+                    or (text == "(" and prev[0] in ("word", "qident") and _word(prev) not in KEYWORDS))
+            if not glue:
+                out.append(" ")
+        out.append(text)
+        newline, spaced = False, False
+        if text == "(":
+            depth += 1
+        elif text == "{":
+            braces += 1
+        elif text == "}":
+            braces = max(0, braces - 1)
+        prev = (kind, text)
+        in_statement = in_statement or kind != "comment"
+    if in_statement:
+        out.append(";")
+    result = "".join(out).strip()
+    return result + "\n" if result else ""
+
+def _signature(tokens) -> List[Tuple[str, str]]:
+    """What render() must preserve: every token but whitespace, up to keyword case, empty statements and a final ';'"""
+    signature: List[Tuple[str, str]] = []
+    in_statement = False
+    for kind, text, _ in tokens:
+        if kind == "ws":
+            continue
+        if kind in ("comment", "meta", "separator"):
+            signature.append((kind, text.rstrip()))
+            in_statement = in_statement and kind != "separator"
+            continue
+        if text == ";":
+            if in_statement:
+                signature.append((kind, text))
+            in_statement = False
+            continue
+        signature.append((kind, text.upper() if kind == "word" and text.upper() in KEYWORDS else text))
+        in_statement = True
+    if in_statement:
+        signature.append(("punct", ";"))
+    return signature
+
+def check_sql(sql: str, normalize: str = "none") -> Dict[str, Any]:
+    """Tokenize, validate and optionally normalize; returns a plain dict so it can cross process boundaries"""
+    tokens, lexical, backslash_escapes = _tokenize(sql, None)
+    structural, warnings, statements = validate(tokens) if not lexical else ([], [], 0)
+    line_starts = [0] + [m.end() for m in re.finditer("\n", sql)]
+
+    def issue(offset: int, message: str) -> Dict[str, Any]:
+        line = bisect.bisect_right(line_starts, offset)
+        return {"line": line, "column": offset - line_starts[line - 1] + 1, "offset": offset, "message": message}
+
+    errors = sorted(lexical + structural)[:MAX_ISSUES]
+    result = {
+        "ok": not errors,
+        "errors": [issue(*e) for e in errors],
+        "warnings": [issue(*w) for w in warnings[:MAX_ISSUES]],
+        "statements": statements,
+        "sql": None,
+    }
+    if normalize != "none" and not errors:
+        rendered = render(tokens, pretty=normalize == "format")
+        again, again_errors = tokenize(rendered, backslash_escapes)
+        # Never hand back SQL that would lex differently from the input
+        if not again_errors and _signature(again) == _signature(tokens):
+            result["sql"] = rendered
+        else:
+            result["warnings"] = result["warnings"][:MAX_ISSUES - 1] + [
+                issue(0, "normalization skipped: the rewritten SQL would not match the input token for token")]
+    return result
+
+def format_issues(issues: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"Line {i['line']}, column {i['column']}: {i['message']}" for i in issues)
+
+class SqlChecker:
+    """Runs check_sql off the event loop with an LRU memo keyed by content hash.
+
+    Scripts of at least `inline_bytes` go to a process pool, so parsing never holds the event
+    loop's GIL. Smaller ones run inline, where pickling would cost more than the parse. Concurrent
+    checks of the same SQL share one run.
+    """
+
+    def __init__(self, workers: int, inline_bytes: int = 65536, max_entries: int = 256, max_bytes: int = 64 << 20):
+        self.workers = workers
+        self.inline_bytes = inline_bytes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._pool: ProcessPoolExecutor | None = None
+        self._threads_only = False
+        self._memo: OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], int]] = OrderedDict()
+        self._memo_bytes = 0
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.offloaded = 0
+        self.pool_failures = 0
+
+    async def check(self, sql: str, normalize: str = "none") -> Dict[str, Any]:
+        data = sql.encode()
+        digest = hashlib.sha256(data).hexdigest() if len(data) < self.inline_bytes \
+            else await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        key = (digest, normalize)
+        cached = self._memo.get(key)
+        if cached is not None:
+            self._memo.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = check_sql(sql, normalize) if len(data) < self.inline_bytes else await self._offload(sql, normalize)
+            self._remember(key, result, len(data) + len(result["sql"] or ""))
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # nobody else may be waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _offload(self, sql: str, normalize: str) -> Dict[str, Any]:
+        if self._threads_only:
+            return await asyncio.to_thread(check_sql, sql, normalize)
+        loop = asyncio.get_running_loop()
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self.offloaded += 1
+            return await loop.run_in_executor(self._pool, check_sql, sql, normalize)
+        except (BrokenProcessPool, pickle.PicklingError, AttributeError, OSError) as e:
+            # A dead worker gets a fresh pool next time; a module workers cannot import (e.g. loaded
+            # in-process by the gateway) never will, so that case stays on threads
+            self.pool_failures += 1
+            self._threads_only = not isinstance(e, BrokenProcessPool)
+            logger.warning(f"SQL check process pool unavailable ({type(e).__name__}: {e}); using a thread")
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            return await asyncio.to_thread(check_sql, sql, normalize)
+
+    def _remember(self, key: Tuple[str, str], result: Dict[str, Any], size: int):
+        if size > self.max_bytes:
+            return
+        self._memo[key] = (result, size)
+        self._memo_bytes += size
+        while len(self._memo) > self.max_entries or self._memo_bytes > self.max_bytes:
+            _, (_, evicted) = self._memo.popitem(last=False)
+            self._memo_bytes -= evicted
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._memo),
+            "bytes": self._memo_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "offloaded": self.offloaded,
+            "pool_failures": self.pool_failures,
+        }
@@ -0,0 +1,111 @@
+# test_sql_check.py - Tokenizer false positives and normalization round trips
+import importlib.util
+import os
+import pytest
+from sql_check import check_sql, render, tokenize
+
+def normalized(sql: str, mode: str = "canonical") -> str | None:
+    return check_sql(sql, mode)["sql"]
+
+@pytest.mark.parametrize("sql", [
+    "select 'it\\'s' from t;",                 # MySQL/Hive backslash escape
+    "select 'C:\\' as path from t;",           # standard SQL: backslash is literal
+    "select e'a\\'b', 'x''y' from t;",         # Postgres E'' escapes, doubled quotes
+    "select q'[it's]', nq'{x}', q'!a'b!' from dual;",  # Oracle alternative quoting
+    "\\set limit 10\nselect * from t limit :limit;",   # psql meta-command
+    "select $fn$ it's $fn$, $$x$$;",
+    "select @@ROWCOUNT; select * into ##g from #t;",
+    "select a#>>'{x,y}', b->>'k' from t;",
+    "select * from {{ ref('orders') }};",
+    "# MySQL comment\nselect 1;",
+])
+def test_dialect_syntax_is_not_an_error(sql):
+    report = check_sql(sql)
+    assert report["ok"], report["errors"]
+
+@pytest.mark.parametrize("sql, message", [
+    ("select 'abc from t;", "unterminated string literal"),
+    ("select 1 /* open", "unterminated block comment"),
+    ("select (a, b from t;", "unclosed '('"),
+    ("select a, from t;", "trailing comma before 'from'"),
+    ("select a) from t;", "unmatched ')'"),
+    ("select a \\set", "unexpected character"),
+])
+def test_real_errors_are_reported(sql, message):
+    report = check_sql(sql)
+    assert not report["ok"]
+    assert message in report["errors"][0]["message"]
+
+@pytest.mark.parametrize("sql, expected", [
+    ("select @@ROWCOUNT;", "SELECT @@ROWCOUNT;\n"),
+    ("select * into ##g from t;", "SELECT * INTO ##g FROM t;\n"),
+    ("select a#>>'{x}' from t;", "SELECT a#>>'{x}' FROM t;\n"),
+    ("select * from {{ ref('x') }};", "SELECT * FROM {{ ref('x') }};\n"),
+    ("select {% if full %} a {% endif %} from t;", "SELECT {% if full %} a {% endif %} FROM t;\n"),
+    ("select arr[1] from t;", "SELECT arr[1] FROM t;\n"),
+    ("select /*+ index(t i) */ a from t;", "SELECT /*+ index(t i) */ a FROM t;\n"),
+    ("# comment\nSELECT 1;", "# comment\nSELECT 1;\n"),
+    ("select a -- note\nfrom t", "SELECT a -- note\nFROM t;\n"),
+    ("\\set x 1\nselect :x;", "\\set x 1\nSELECT :x;\n"),
+    ("select a , b from t ;; select count (*) from u", "SELECT a, b FROM t;\nSELECT count(*) FROM u;\n"),
+])
+def test_canonical_only_changes_whitespace_and_keyword_case(sql, expected):
+    assert normalized(sql) == expected
+
+def test_format_keeps_line_comments_on_their_own_line():
+    sql = "select a, -- first\n b from t where x = 1 -- filter\n;"
+    assert normalized(sql, "format") == "SELECT a, -- first\nb\nFROM t\nWHERE x = 1 -- filter\n;\n"
+
+@pytest.mark.parametrize("sql", [
+    "select 'it\\'s', q'[a]' , x :: int from t where a = 1 -- c\n and b in (1, 2);",
+    "select a from t left join u on t.id = u.id where a in (select b from v) order by a;",
+    "# c\nselect 5 # 3;",
+])
+@pytest.mark.parametrize("mode", ["canonical", "format"])
+def test_normalized_sql_lexes_to_the_same_tokens(sql, mode):
+    out = normalized(sql, mode)
+    assert out is not None
+    assert normalized(out, mode) == out  # idempotent
+    original, _ = tokenize(sql)
+    again, errors = tokenize(out)
+    assert not errors
+    strip = lambda tokens: [(kind, text.upper() if kind == "word" else text.rstrip()) for kind, text, _ in tokens
+                            if kind != "ws"]
+    assert strip(again)[:len(strip(original))] == strip(original)
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT a FROM t\nGO", "SELECT a FROM t\nGO\n"),                       # T-SQL batch separator
+    ("select a from t;\n  go  \nselect b from u", "SELECT a FROM t;\ngo\nSELECT b FROM u;\n"),
+    ("BEGIN\n NULL;\nEND;\n/", "BEGIN NULL;\nEND;\n/\n"),                   # SQL*Plus block terminator
+    ("select 10 /\n 2 from t", "SELECT 10 / 2 FROM t;\n"),                   # division, not a separator
+    ("select go from t", "SELECT go FROM t;\n"),
+])
+@pytest.mark.parametrize("mode", ["canonical", "format"])
+def test_batch_separators_keep_their_own_line(sql, expected, mode):
+    out = normalized(sql, mode)
+    if mode == "canonical":
+        assert out == expected
+    assert [line.strip() for line in out.splitlines() if line.strip().upper() in ("GO", "/")] == \
+           [line.strip() for line in sql.splitlines() if line.strip().upper() in ("GO", "/")]
+
+def test_batch_separator_ends_a_statement():
+    report = check_sql("select a,\nGO\nselect b")
+    assert [e["message"] for e in report["errors"]] == ["trailing comma before 'GO'"]
+    assert check_sql("select a\nGO\nselect b\n/\n")["statements"] == 2
+
+def test_normalization_is_skipped_when_tokens_would_change():
+    report = check_sql("select a . 5 from t;", "canonical")  # gluing would lex 'a' '.5'
+    assert report["ok"] and report["sql"] is None
+    assert "normalization skipped" in report["warnings"][-1]["message"]
+
+def test_render_drops_only_empty_statements():
+    tokens, _ = tokenize(";; select 1 ;;")
+    assert render(tokens, pretty=False) == "SELECT 1;\n"
+
+def test_validation_is_opt_in():
+    # Every tool service has an app.py, so load this one by path rather than from sys.path
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    spec = importlib.util.spec_from_file_location("sqlgenerator_app", path)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    assert app.parse_check_options({}) == (False, "none")
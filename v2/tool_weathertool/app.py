@@ -1,18 +1,148 @@
 # app.py - Weather Tool (Minimal)
 import os
+import sys
+import time
 import httpx
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Dict, Any, Union
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from typing import Dict, Any
 
-app = FastAPI()
+# Shared v2 modules live in ../common in the source tree; the image copies them into /app/common
+_V2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.isdir(os.path.join(_V2_DIR, "common")) and _V2_DIR not in sys.path:
+    sys.path.append(_V2_DIR)
 
-class ToolRequest(BaseModel):
-    tool_name: str
-    arguments: Dict[str, Any]
-    request_id: Union[int, str]
+from http_pool import create_client, pool_stats
+from cache import TTLCache, background_refresh
+from disk_cache import DiskCache
+from scheduler import UpstreamScheduler
+from locations import LocationIndex, CITY_TABLE
+from common.metrics import REGISTRY, CONTENT_TYPE
+from common.batch import ToolRequest, make_batch_route
+from common.tool_metrics import current_request_id, instrument, SLOW_REQUEST_MS
+from common.wire import WireResponse, WireMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Shared upstream client (created in lifespan, reused across requests)
+_client: httpx.AsyncClient | None = None
+
+# Optional on-disk tier (SQLite, WAL): kept across restarts and shared by processes on the host
+WEATHER_CACHE_DB = os.getenv("WEATHER_CACHE_DB", "")
+_disk_cache = DiskCache(WEATHER_CACHE_DB, max_entries=int(os.getenv("WEATHER_CACHE_DB_MAX_ENTRIES", "100000"))) \
+    if WEATHER_CACHE_DB else None
+CACHE_COMPACT_INTERVAL = float(os.getenv("WEATHER_CACHE_COMPACT_INTERVAL", "300"))
+
+# Upstream response cache, keyed on (endpoint, canonical location query, units)
+_cache = TTLCache(max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024")), store=_disk_cache)
+CACHE_TTL = {
+    "weather": float(os.getenv("WEATHER_CACHE_TTL_CURRENT", "600")),
+    "forecast": float(os.getenv("WEATHER_CACHE_TTL_FORECAST", "1800")),
+}
+# Past its TTL an entry is still served for this long while a background fetch refreshes it
+CACHE_STALE_TTL = float(os.getenv("WEATHER_CACHE_STALE_TTL", "300"))
+# Hottest keys are refreshed ahead of expiry on this schedule (top N = 0 disables)
+PREFETCH_TOP_N = int(os.getenv("WEATHER_PREFETCH_TOP_N", "50"))
+PREFETCH_INTERVAL = float(os.getenv("WEATHER_PREFETCH_INTERVAL", "60"))
+
+# Known cities resolve to coordinates, so spellings of one city share a cache entry and upstream call
+_locations = LocationIndex.load(os.getenv("WEATHER_CITY_TABLE", CITY_TABLE))
+
+# OpenWeather quota: calls are released at the plan's rate, current weather ahead of forecasts
+_scheduler = UpstreamScheduler(
+    rate_per_minute=float(os.getenv("OPENWEATHER_RATE_PER_MINUTE", "60")),
+    burst=float(os.getenv("OPENWEATHER_BURST", "10")),
+    max_queue=int(os.getenv("OPENWEATHER_MAX_QUEUE", "1000")),
+)
+UPSTREAM_PRIORITY = {"weather": 0, "forecast": 1}
+BACKGROUND_PRIORITY = 2  # added for refreshes/prefetches: callers waiting on a miss go first
+# How long a call may wait for quota; keep below the gateway's http.timeout so nobody waits on a dead caller
+UPSTREAM_MAX_WAIT = float(os.getenv("OPENWEATHER_MAX_WAIT", "10"))
+
+# OpenWeather time, separate from tool handler time (cache hits never reach it)
+_upstream_duration = REGISTRY.histogram("mcptool_upstream_duration_seconds", "OpenWeather API time", ("api",))
+_upstream_errors = REGISTRY.counter("mcptool_upstream_errors_total", "Failed OpenWeather calls", ("api",))
+
+# Overridable so benchmarks can point at a local stand-in server
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5").rstrip("/")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _client
+    _client = create_client()
+    await _cache.warm()  # no cold start after a restart when the disk tier is on
+    compact = asyncio.create_task(_disk_cache.compact_loop(CACHE_COMPACT_INTERVAL)) if _disk_cache else None
+    prefetch = asyncio.create_task(_cache.prefetch_loop(PREFETCH_TOP_N, PREFETCH_INTERVAL)) if PREFETCH_TOP_N > 0 else None
+    try:
+        yield
+    finally:
+        if prefetch is not None:
+            prefetch.cancel()
+        if compact is not None:
+            compact.cancel()
+        await _cache.close()
+        if _disk_cache is not None:
+            await _disk_cache.close()
+        await _scheduler.close()
+        await _client.aclose()
+
+# Responses are MessagePack/JSON and compressed as each client negotiates
+app = FastAPI(lifespan=lifespan, default_response_class=WireResponse)
+app.add_middleware(WireMiddleware)
+
+class UpstreamError(Exception):
+    """OpenWeather returned a non-200 response"""
+
+def normalize_location(location: str) -> str:
+    return ",".join(" ".join(part.split()) for part in location.lower().split(","))
+
+def location_query(location: str) -> Dict[str, Any]:
+    """Canonical OpenWeather query params: lat/lon for indexed cities, else the normalized name"""
+    place = _locations.resolve(location)
+    if place is not None:
+        return {"lat": place.lat, "lon": place.lon}
+    return {"q": normalize_location(location)}
+
+def retry_after(response: httpx.Response, default: float = 60.0) -> float:
+    try:
+        return float(response.headers.get("Retry-After", default))
+    except ValueError:  # HTTP-date form
+        return default
+
+async def fetch_openweather(endpoint: str, location: str, units: str, api_key: str) -> dict:
+    """Fetch an OpenWeather payload, served from cache when fresh"""
+    query = location_query(location)
+
+    async def fetch():
+        params = {**query, "units": units, "appid": api_key}  # httpx URL-encodes the query string
+        priority = UPSTREAM_PRIORITY[endpoint] + (BACKGROUND_PRIORITY if background_refresh.get() else 0)
+        await _scheduler.acquire(priority, time.monotonic() + UPSTREAM_MAX_WAIT)
+        start = time.perf_counter()
+        try:
+            response = await _client.get(f"{OPENWEATHER_BASE_URL}/{endpoint}", params=params)
+            data = response.json()
+        except Exception:
+            _upstream_errors.inc(endpoint)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _upstream_duration.observe(elapsed, endpoint)
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning(f"Slow OpenWeather {endpoint} call request_id={current_request_id.get()}: {elapsed * 1000:.1f}ms")
+        if response.status_code == 429:
+            _scheduler.penalize(retry_after(response))
+        if response.status_code != 200:
+            _upstream_errors.inc(endpoint)
+            raise UpstreamError(data.get('message', 'API error'))
+        return data
+
+    key = (endpoint, tuple(query.items()), units)
+    return await _cache.get_or_fetch(key, CACHE_TTL[endpoint], fetch, stale_ttl=CACHE_STALE_TTL)
 
 @app.post("/v1/get_current_weather")
+@instrument("get_current_weather")
 async def get_weather(request: ToolRequest):
     try:
         location = request.arguments.get("location")
@@ -26,26 +156,20 @@ async def get_weather(request: ToolRequest):
         if not api_key:
             return {"content": [{"type": "text", "text": "Missing OPENWEATHER_API_KEY"}], "isError": True}
             
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&units={units}&appid={api_key}"
+        data = await fetch_openweather("weather", location, units, api_key)
+        
+        temp = round(data['main']['temp'], 1)
+        desc = data['weather'][0]['description']
+        temp_unit = "°C" if units == "metric" else "°F"
+        
+        text = f"Weather in {location}: {temp}{temp_unit}, {desc}"
+        return {"content": [{"type": "text", "text": text}], "isError": False}
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-            if response.status_code != 200:
-                return {"content": [{"type": "text", "text": f"Error: {data.get('message', 'API error')}"}], "isError": True}
-            
-            temp = round(data['main']['temp'], 1)
-            desc = data['weather'][0]['description']
-            temp_unit = "°C" if units == "metric" else "°F"
-            
-            text = f"Weather in {location}: {temp}{temp_unit}, {desc}"
-            return {"content": [{"type": "text", "text": text}], "isError": False}
-            
     except Exception as e:
         return {"content": [{"type": "text", "text": f"Error: {str(e)}"}], "isError": True}
 
 @app.post("/v1/forecast_weather")
+@instrument("forecast_weather")
 async def forecast_weather(request: ToolRequest):
     try:
         location = request.arguments.get("location")
@@ -63,37 +187,42 @@ async def forecast_weather(request: ToolRequest):
         if not api_key:
             return {"content": [{"type": "text", "text": "Missing OPENWEATHER_API_KEY"}], "isError": True}
             
-        url = f"https://api.openweathermap.org/data/2.5/forecast?q={location}&units={units}&appid={api_key}"
+        data = await fetch_openweather("forecast", location, units, api_key)
+        
+        temp_unit = "°C" if units == "metric" else "°F"
+        forecasts = []
+        
+        # Slice days out of the cached 5-day payload (API returns 3-hour intervals)
+        for i in range(0, min(days * 8, len(data['list'])), 8):  # 8 = 24h/3h
+            item = data['list'][i]
+            date = item['dt_txt'].split(' ')[0]
+            temp = round(item['main']['temp'], 1)
+            desc = item['weather'][0]['description']
+            forecasts.append(f"{date}: {temp}{temp_unit}, {desc}")
+        
+        text = f"Forecast for {location}:\n" + "\n".join(forecasts)
+        return {"content": [{"type": "text", "text": text}], "isError": False}
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            data = response.json()
-            
-            if response.status_code != 200:
-                return {"content": [{"type": "text", "text": f"Error: {data.get('message', 'API error')}"}], "isError": True}
-            
-            temp_unit = "°C" if units == "metric" else "°F"
-            forecasts = []
-            
-            # Get forecasts for next few days (API returns 3-hour intervals)
-            for i in range(0, min(days * 8, len(data['list'])), 8):  # 8 = 24h/3h
-                item = data['list'][i]
-                date = item['dt_txt'].split(' ')[0]
-                temp = round(item['main']['temp'], 1)
-                desc = item['weather'][0]['description']
-                forecasts.append(f"{date}: {temp}{temp_unit}, {desc}")
-            
-            text = f"Forecast for {location}:\n" + "\n".join(forecasts)
-            return {"content": [{"type": "text", "text": text}], "isError": False}
-            
     except ValueError:
         return {"content": [{"type": "text", "text": "Invalid days parameter - must be a number"}], "isError": True}
     except Exception as e:
         return {"content": [{"type": "text", "text": f"Error: {str(e)}"}], "isError": True}
 
+# /v1/batch items are dispatched by tool name
+make_batch_route(app, {
+    "get_current_weather": get_weather,
+    "forecast_weather": forecast_weather,
+})
+
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "http_pool": pool_stats(_client), "cache": _cache.stats(),
+            "hot_keys": [{"key": list(key), "hits": hits} for key, hits in _cache.hot_keys(5)],
+            "upstream_scheduler": _scheduler.stats(), "locations": _locations.stats()}
+
+@app.get("/metrics")
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,8 +1,8 @@
 #!/usr/bin/env bash
 set -euo pipefail
-docker-compose down --rmi local -v
+docker-compose down --rmi local  # keep the weather-cache volume across rebuilds
 docker ps -a --filter ancestor=weather-tool:latest -q | xargs -r docker rm -f
 docker rmi -f weather-tool:latest || true
-docker build -t weather-tool:latest .
+docker build --build-context common=../common -t weather-tool:latest .  # common/: modules shared by the v2 services
 docker-compose up -d
 echo "✅ Weather Tool running at: http://localhost:9001"
\ No newline at end of file
@@ -0,0 +1,234 @@
+# cache.py - TTL + LRU response cache with single-flight coalescing, stale-while-revalidate, hot-key prefetch
+# and an optional persistent tier (disk_cache.DiskCache)
+import time
+import random
+import asyncio
+import logging
+import heapq
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# True inside background refreshes, so fetchers can give them lower upstream priority
+background_refresh: ContextVar[bool] = ContextVar("background_refresh", default=False)
+
+def _retrieve(task: asyncio.Task):
+    # Errors are not cached; mark them retrieved so one nobody else awaited isn't logged
+    if not task.cancelled():
+        task.exception()
+
+class _Entry:
+    __slots__ = ("fresh_until", "stale_until", "value", "fetch", "ttl", "stale_ttl", "hits")
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float, fetch: Callable[[], Awaitable[Any]] | None):
+        now = time.monotonic()
+        self.fresh_until = now + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+        self.value = value
+        self.fetch = fetch  # kept so the entry can be refreshed without a caller
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0.0  # decayed access count
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a per-call TTL.
+
+    Concurrent misses for the same key share one fetch (single-flight). Entries past their
+    TTL but within `stale_ttl` are served immediately while one background fetch refreshes
+    them, and prefetch_loop() refreshes the hottest keys before they expire at all.
+
+    With a `store`, misses are looked up there before fetching and fetched values are written
+    through, so entries survive restarts and are shared with other processes on the host.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_jitter: float = 0.1, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self.ttl_jitter = ttl_jitter  # +-10%: entries written together don't all expire together
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._background: set[asyncio.Task] = set()
+        self._writes: set[asyncio.Task] = set()  # write-through to the store, awaited on close
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.prefetches = 0
+        self.store_hits = 0
+        self.warm_loaded = 0
+
+    def _lookup(self, key: Hashable) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.stale_until <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._lookup(key)
+        if entry is None or entry.fresh_until <= time.monotonic():
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0.0,
+            fetch: Callable[[], Awaitable[Any]] | None = None):
+        jittered = ttl * (1 + random.uniform(-self.ttl_jitter, self.ttl_jitter))
+        entry = _Entry(value, jittered, stale_ttl, fetch)
+        entry.ttl = ttl  # refreshes re-jitter from the configured TTL
+        self._insert(key, entry)
+        if self.store is not None:
+            task = asyncio.create_task(self.store.put(key, value, jittered, jittered + stale_ttl, ttl, stale_ttl))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    def _insert(self, key: Hashable, entry: _Entry):
+        old = self._entries.get(key)
+        if old is not None:
+            entry.hits = old.hits
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _restore(self, stored, fetch: Callable[[], Awaitable[Any]] | None) -> _Entry:
+        """Insert an entry read from the store, keeping its remaining lifetime"""
+        entry = _Entry(stored.value, stored.fresh_for, stored.stale_for - stored.fresh_for, fetch)
+        entry.ttl, entry.stale_ttl = stored.ttl, stored.stale_ttl
+        self._insert(stored.key, entry)
+        return entry
+
+    async def warm(self):
+        """Fill the in-memory tier from the store (freshest entries first), e.g. at startup"""
+        if self.store is None:
+            return
+        for stored in reversed(await self.store.load(self.max_entries)):
+            self._restore(stored, None)  # a fetch is attached by the first caller
+            self.warm_loaded += 1
+
+    async def get_or_fetch(self, key: Hashable, ttl: float, fetch: Callable[[], Awaitable[Any]],
+                           stale_ttl: float = 0.0) -> Any:
+        """Return the cached value or run `fetch` once for all concurrent callers"""
+        entry = self._lookup(key)
+        if entry is not None:
+            entry.hits += 1
+            if entry.fetch is None:
+                entry.fetch = fetch  # warm-loaded entry: now refreshable
+            if entry.fresh_until > time.monotonic():
+                self.hits += 1
+                return entry.value
+            # Stale: answer now, refresh behind the caller's back
+            self.stale_hits += 1
+            self._refresh_in_background(key, entry)
+            return entry.value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        value = await asyncio.shield(self._start_fetch(key, ttl, stale_ttl, fetch))
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.hits += 1
+        return value
+
+    def _start_fetch(self, key: Hashable, ttl: float, stale_ttl: float,
+                     fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Run a fetch as its own task; callers await it shielded, so one that disconnects doesn't cancel it for the rest"""
+        task = asyncio.create_task(self._fetch(key, ttl, stale_ttl, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(_retrieve)
+        return task
+
+    async def _fetch(self, key: Hashable, ttl: float, stale_ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        stale = None
+        try:
+            stored = await self.store.get(key) if self.store is not None else None
+            if stored is not None and (stored.fresh_for > 0 or not background_refresh.get()):
+                # Fetched by another process or before a restart; a stale one is served while it refreshes
+                self.store_hits += 1
+                value = stored.value
+                entry = self._restore(stored, fetch)
+                if stored.fresh_for <= 0:
+                    stale = entry
+            else:
+                value = await fetch()
+                self.set(key, value, ttl, stale_ttl, fetch)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+            if stale is not None:
+                self._refresh_in_background(key, stale)
+
+    def _refresh_in_background(self, key: Hashable, entry: _Entry) -> bool:
+        if key in self._inflight or entry.fetch is None:
+            return False
+
+        async def refresh():
+            background_refresh.set(True)
+            try:
+                await self._start_fetch(key, entry.ttl, entry.stale_ttl, entry.fetch)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1  # keep serving the old value until it goes fully stale
+                logger.debug(f"Background refresh of {key} failed: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return True
+
+    async def prefetch_loop(self, top_n: int, interval: float, decay: float = 0.5, min_hits: float = 1.0):
+        """Every `interval`, refresh the top_n most-accessed keys that would expire before the next run.
+
+        Refreshes are spread across the interval rather than fired together; access counts decay
+        each round so yesterday's hot keys fall out of the set.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            horizon = time.monotonic() + 1.5 * interval  # this round's refreshes are spread over interval/2
+            hot = heapq.nlargest(top_n, self._entries.items(), key=lambda item: item[1].hits)
+            due = [(key, entry) for key, entry in hot if entry.hits >= min_hits and entry.fresh_until <= horizon]
+            for entry in self._entries.values():
+                entry.hits *= decay
+            for key, entry in due:
+                if self._entries.get(key) is entry and self._refresh_in_background(key, entry):
+                    self.prefetches += 1
+                await asyncio.sleep(interval / (2 * len(due)))
+
+    async def close(self):
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def hot_keys(self, n: int = 10) -> list:
+        return [(key, round(entry.hits, 2)) for key, entry in
+                heapq.nlargest(n, self._entries.items(), key=lambda item: item[1].hits)]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "prefetches": self.prefetches,
+            "store_hits": self.store_hits,
+            "warm_loaded": self.warm_loaded,
+            **({"store": self.store.stats()} if self.store is not None else {}),
+        }
@@ -0,0 +1,149 @@
+# disk_cache.py - SQLite (WAL) tier below TTLCache: survives restarts and is shared by processes on one host
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Hashable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+class Stored(NamedTuple):
+    key: Hashable
+    value: Any
+    fresh_for: float  # seconds from now; negative once past the TTL
+    stale_for: float  # seconds from now until the entry may no longer be served at all
+    ttl: float
+    stale_ttl: float
+
+def encode_key(key: Hashable) -> str:
+    return json.dumps(key, separators=(",", ":"))
+
+def decode_key(text: str) -> Hashable:
+    def to_tuple(value):
+        return tuple(to_tuple(v) for v in value) if isinstance(value, list) else value
+    return to_tuple(json.loads(text))
+
+class DiskCache:
+    """JSON values with wall-clock expiry in one SQLite file.
+
+    WAL mode lets other processes read while one writes. Every call runs on a single worker
+    thread that owns the connection, so the event loop never blocks on disk. Disk errors are
+    counted and logged, but they never fail a request: the tier just behaves as a miss.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")
+        self._conn: sqlite3.Connection | None = None
+        self.reads = 0
+        self.read_hits = 0
+        self.writes = 0
+        self.compacted = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # takes effect on a new file only
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: survives process crashes, cheap commits
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL, fresh_until REAL NOT NULL,
+                stale_until REAL NOT NULL, ttl REAL NOT NULL, stale_ttl REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_stale_until ON entries (stale_until)")
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args, default=None):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"Disk cache {self.path}: {fn.__name__} failed: {e}")
+            return default
+
+    @staticmethod
+    def _row(key: Hashable, row, now: float) -> Stored:
+        value, fresh_until, stale_until, ttl, stale_ttl = row
+        return Stored(key, json.loads(value), fresh_until - now, stale_until - now, ttl, stale_ttl)
+
+    def _get(self, key: Hashable) -> Stored | None:
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT value, fresh_until, stale_until, ttl, stale_ttl FROM entries WHERE key = ? AND stale_until > ?",
+            (encode_key(key), now)).fetchone()
+        return self._row(key, row, now) if row else None
+
+    def _put(self, key: Hashable, value: Any, fresh_for: float, stale_for: float, ttl: float, stale_ttl: float):
+        now = time.time()
+        self._connect().execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                                (encode_key(key), json.dumps(value), now + fresh_for, now + stale_for, ttl, stale_ttl))
+        return True
+
+    def _load(self, limit: int) -> List[Stored]:
+        now = time.time()
+        rows = self._connect().execute(
+            "SELECT key, value, fresh_until, stale_until, ttl, stale_ttl FROM entries WHERE stale_until > ? "
+            "ORDER BY fresh_until DESC LIMIT ?", (now, limit)).fetchall()
+        return [self._row(decode_key(row[0]), row[1:], now) for row in rows]
+
+    def _compact(self) -> int:
+        """Drop entries that can no longer be served, then the soonest-expiring beyond max_entries"""
+        conn = self._connect()
+        removed = conn.execute("DELETE FROM entries WHERE stale_until <= ?", (time.time(),)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += conn.execute("DELETE FROM entries WHERE key IN "
+                                    "(SELECT key FROM entries ORDER BY stale_until LIMIT ?)", (excess,)).rowcount
+        if removed:
+            conn.execute("PRAGMA incremental_vacuum")
+        return removed
+
+    async def get(self, key: Hashable) -> Stored | None:
+        self.reads += 1
+        stored = await self._run(self._get, key)
+        if stored is not None:
+            self.read_hits += 1
+        return stored
+
+    async def put(self, key: Hashable, value: Any, fresh_for: float, stale_for: float, ttl: float, stale_ttl: float):
+        if await self._run(self._put, key, value, fresh_for, stale_for, ttl, stale_ttl):
+            self.writes += 1
+
+    async def load(self, limit: int) -> List[Stored]:
+        """Entries still servable, freshest first (for warming the in-memory tier at startup)"""
+        return await self._run(self._load, limit, default=[])
+
+    async def compact(self) -> int:
+        removed = await self._run(self._compact, default=0)
+        self.compacted += removed
+        return removed
+
+    async def compact_loop(self, interval: float):
+        while True:
+            await self.compact()
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        def close_connection():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        await self._run(close_connection)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "reads": self.reads,
+            "read_hits": self.read_hits,
+            "writes": self.writes,
+            "compacted": self.compacted,
+            "errors": self.errors,
+        }
@@ -0,0 +1,52 @@
+# http_pool.py - Shared upstream HTTP client
+import os
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def create_client() -> httpx.AsyncClient:
+    """Create the app-lifetime client from HTTP_* environment settings"""
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+    http2 = _env_flag("HTTP2")
+    if http2 and not http2_available():
+        logger.warning("HTTP2 requested but 'h2' is not installed - falling back to HTTP/1.1")
+        http2 = False
+
+    logger.info(f"Upstream client: limits={limits}, timeout={timeout}s, http2={http2}")
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+def pool_stats(client: httpx.AsyncClient | None) -> dict:
+    """Connection pool snapshot (reads httpcore internals, best effort)"""
+    if client is None or client.is_closed:
+        return {"open": False}
+
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {
+        "open": True,
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "http2": sum(1 for c in connections if "HTTP/2" in c.info()),
+        "pending_requests": len(getattr(pool, "_requests", [])),
+        "max_connections": getattr(pool, "_max_connections", None),
+        "max_keepalive": getattr(pool, "_max_keepalive_connections", None),
+        "keepalive_expiry": getattr(pool, "_keepalive_expiry", None),
+    }
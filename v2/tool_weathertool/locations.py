@@ -0,0 +1,97 @@
+# locations.py - Local city index: resolves free-text locations to canonical coordinates
+import os
+import unicodedata
+from typing import Dict, List, NamedTuple, Tuple
+
+CITY_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cities.tsv")
+
+# Spellings of country names seen in tool calls -> ISO 3166 alpha-2 (any two-letter code is taken as-is)
+COUNTRY_ALIASES = {
+    "uk": "GB", "united kingdom": "GB", "great britain": "GB", "britain": "GB",
+    "england": "GB", "scotland": "GB", "wales": "GB", "northern ireland": "GB",
+    "usa": "US", "united states": "US", "united states of america": "US", "america": "US",
+    "ireland": "IE", "france": "FR", "germany": "DE", "deutschland": "DE", "netherlands": "NL",
+    "holland": "NL", "belgium": "BE", "switzerland": "CH", "austria": "AT", "czechia": "CZ",
+    "czech republic": "CZ", "poland": "PL", "hungary": "HU", "denmark": "DK", "sweden": "SE",
+    "norway": "NO", "finland": "FI", "spain": "ES", "portugal": "PT", "italy": "IT", "greece": "GR",
+    "turkey": "TR", "turkiye": "TR", "russia": "RU", "ukraine": "UA", "canada": "CA", "mexico": "MX",
+    "cuba": "CU", "colombia": "CO", "peru": "PE", "chile": "CL", "argentina": "AR", "brazil": "BR",
+    "egypt": "EG", "nigeria": "NG", "kenya": "KE", "south africa": "ZA", "morocco": "MA",
+    "uae": "AE", "united arab emirates": "AE", "saudi arabia": "SA", "israel": "IL", "iran": "IR",
+    "pakistan": "PK", "india": "IN", "bangladesh": "BD", "thailand": "TH", "singapore": "SG",
+    "malaysia": "MY", "indonesia": "ID", "philippines": "PH", "vietnam": "VN", "hong kong": "HK",
+    "taiwan": "TW", "china": "CN", "south korea": "KR", "korea": "KR", "japan": "JP",
+    "australia": "AU", "new zealand": "NZ",
+}
+
+class Place(NamedTuple):
+    name: str
+    country: str
+    lat: float
+    lon: float
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace ("São Paulo " -> "sao paulo")"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace(".", "").replace("'", "")
+    return " ".join(text.split())
+
+def country_code(text: str) -> str | None:
+    key = fold(text)
+    if len(key) == 2 and key.isalpha():
+        return COUNTRY_ALIASES.get(key, key.upper())
+    return COUNTRY_ALIASES.get(key)
+
+class LocationIndex:
+    """Name/alias -> candidate places, most populous first, loaded once from a TSV table"""
+
+    def __init__(self, places: List[Place], populations: List[int], names: List[Tuple[int, str]]):
+        self.places = places
+        by_name: Dict[str, List[int]] = {}
+        for row, name in names:
+            candidates = by_name.setdefault(fold(name), [])
+            if row not in candidates:
+                candidates.append(row)
+        self._by_name = {k: tuple(sorted(v, key=lambda r: -populations[r])) for k, v in by_name.items()}
+        self.resolved = 0
+        self.unresolved = 0
+
+    @classmethod
+    def load(cls, path: str = CITY_TABLE) -> "LocationIndex":
+        places, populations, names = [], [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                row = len(places)
+                places.append(Place(fields[0], fields[1], round(float(fields[2]), 4), round(float(fields[3]), 4)))
+                populations.append(int(fields[4]))
+                names.append((row, fields[0]))
+                if len(fields) > 5 and fields[5]:
+                    names += [(row, alias) for alias in fields[5].split("|")]
+        return cls(places, populations, names)
+
+    def resolve(self, location: str) -> Place | None:
+        """'london', 'London,UK' and 'London, GB' all resolve to the same place; None if unknown/ambiguous
+
+        The index has no states or regions, so "Portland, ME, US" is left to the upstream q= lookup
+        rather than matched on name and country alone.
+        """
+        parts = [p for p in (part.strip() for part in location.split(",")) if p]
+        if not parts or len(parts) > 2:
+            self.unresolved += 1
+            return None
+        candidates = self._by_name.get(fold(parts[0]), ())
+        if len(parts) > 1:
+            country = country_code(parts[1])
+            candidates = [r for r in candidates if self.places[r].country == country] if country else ()
+        if not candidates:
+            self.unresolved += 1
+            return None
+        self.resolved += 1
+        return self.places[candidates[0]]
+
+    def stats(self) -> dict:
+        return {"places": len(self.places), "resolved": self.resolved, "unresolved": self.unresolved}
@@ -0,0 +1,120 @@
+# scheduler.py - Quota-aware OpenWeather call scheduler (token bucket + priority queue with deadlines)
+import time
+import heapq
+import asyncio
+import itertools
+
+class UpstreamBusy(Exception):
+    """Too many calls already waiting for quota"""
+
+class DeadlineExceeded(Exception):
+    """No quota became available before the caller's deadline"""
+
+class UpstreamScheduler:
+    """Releases upstream calls at the plan's rate; waiting calls go out by priority, then arrival.
+
+    Lower priority values go first. A waiter that times out or is cancelled is skipped by the
+    dispatcher, so abandoned work never consumes quota. A 429 pauses dispatching (penalize).
+    """
+
+    def __init__(self, rate_per_minute: float, burst: float, max_queue: int = 1000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_queue = max_queue
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._heap: list = []  # (priority, seq, future)
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.granted = 0
+        self.queued = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def _time_to_token(self) -> float:
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return max(0.0, self.updated - time.monotonic()) + (1 - self.tokens) / self.rate
+
+    async def acquire(self, priority: int, deadline: float):
+        """Wait for a quota token; `deadline` is a time.monotonic() value"""
+        if not self._heap and self._time_to_token() == 0:
+            self.tokens -= 1
+            self.granted += 1
+            return
+        if len(self._heap) >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamBusy(f"upstream queue full ({len(self._heap)} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self.queued += 1
+        self._ensure_dispatcher()
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("timed out waiting for upstream quota") from None
+
+    def penalize(self, seconds: float):
+        """Upstream said slow down: spend the bucket and hold dispatching for `seconds`"""
+        self.throttled += 1
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    def _ensure_dispatcher(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            while self._heap and self._heap[0][2].done():
+                heapq.heappop(self._heap)  # caller timed out or went away
+                self.dropped += 1
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            wait = self._time_to_token()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, future = heapq.heappop(self._heap)
+            if future.done():
+                self.dropped += 1
+                continue
+            self.tokens -= 1
+            self.granted += 1
+            future.set_result(None)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "rate_per_minute": round(self.rate * 60, 3),
+            "tokens": round(self.tokens, 3),
+            "waiting": len(self._heap),
+            "granted": self.granted,
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+        }
@@ -0,0 +1,25 @@
+# test_locations.py - City index lookups, including qualifiers the index cannot check
+import pytest
+from locations import LocationIndex
+
+@pytest.fixture(scope="module")
+def index() -> LocationIndex:
+    return LocationIndex.load()
+
+@pytest.mark.parametrize("location", ["london", "London,UK", "London, GB", "  LONDON , united kingdom "])
+def test_spellings_share_one_place(index, location):
+    place = index.resolve(location)
+    assert (place.name, place.country) == ("London", "GB")
+
+def test_country_picks_among_same_name(index):
+    assert index.resolve("London, CA").country == "CA"
+
+@pytest.mark.parametrize("location", [
+    "Portland, ME, US",      # state qualifier: the index only knows Portland, OR
+    "Springfield, IL, US",
+    "Portland, OR",          # a state is not a country
+    "London, Narnia",
+    "",
+])
+def test_unverifiable_qualifiers_fall_back_to_query(index, location):
+    assert index.resolve(location) is None